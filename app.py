@@ -5,9 +5,13 @@ from pages.historical_export import render_export
 from pages.zipper import render_zipper
 from pages.document_export import render_document_export
 from pages.field_overview import render_fields_export
+from core.exports import purge_exports_due
 
 st.set_page_config(page_title="Technical Consulting Toolbox")
 
+# Remove finished exports nobody downloaded in time
+purge_exports_due()
+
 # Dölj Streamlit-menyn och fotnoter
 hide_streamlit_style = """
     <style>
@@ -22,13 +26,15 @@ hide_streamlit_style = """
 st.markdown(hide_streamlit_style, unsafe_allow_html=True)
 
 
-# Simple session‐based navigation
+# Simple session‐based navigation; the page is mirrored in the URL so a
+# browser refresh returns to it (and to any background job it shows)
 if "page" not in st.session_state:
-    st.session_state.page = "start"
+    st.session_state.page = st.query_params.get("page", "start")
 
 
 def go_to(page):
     st.session_state.page = page
+    st.query_params["page"] = page
 
 
 # Render the correct page
@@ -0,0 +1,2 @@
+# tctoolbox/benchmarks/__init__.py
+# Offline tooling: a synthetic CatalystOne tenant, a local mock API and benchmarks.
@@ -0,0 +1,300 @@
+# tctoolbox/benchmarks/mock_api.py
+"""Local stand-in for the CatalystOne API, serving a synthetic tenant.
+
+Run it and point the toolbox at it through ``TCTOOLBOX_BASE_URL``::
+
+    python -m benchmarks.mock_api --employees 10000 --port 8765
+    TCTOOLBOX_BASE_URL="http://127.0.0.1:8765/{domain}/mono/api" streamlit run app.py
+"""
+import argparse
+import json
+import random
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from benchmarks.synthetic import SyntheticTenant
+
+# Employees are flushed to the socket in chunks of roughly this size
+FLUSH_BYTES = 64 * 1024
+
+
+class FaultProfile:
+    """Latency and failures injected into every API response."""
+
+    def __init__(
+        self,
+        latency=0.0,
+        jitter=0.0,
+        rate_429=0.0,
+        failure_rate=0.0,
+        retry_after=1,
+        max_concurrency=None,
+        token_ttl=3600,
+        seed=0,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_429 = rate_429
+        self.failure_rate = failure_rate
+        self.retry_after = retry_after
+        # Requests above this many in flight are answered with 429
+        self.max_concurrency = max_concurrency
+        self.token_ttl = token_ttl
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def delay(self) -> float:
+        with self._lock:
+            return self.latency + self._rng.uniform(0, self.jitter)
+
+    def roll(self, probability: float) -> bool:
+        if probability <= 0:
+            return False
+        with self._lock:
+            return self._rng.random() < probability
+
+
+class MockApiServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, tenant, faults=None, host="127.0.0.1", port=0):
+        super().__init__((host, port), _Handler)
+        self.tenant = tenant
+        self.faults = faults or FaultProfile()
+        self.tokens = {}
+        self.stats = Counter()
+        self.in_flight = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def base_url(self, domain="mock") -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/{domain}/mono/api"
+
+    @property
+    def base_url_template(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/{{domain}}/mono/api"
+
+    def start(self):
+        """Serve on a background thread; returns self for chaining."""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def handle_error(self, request, client_address):
+        # Clients dropping keep-alive connections is not worth a traceback
+        if isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            return
+        super().handle_error(request, client_address)
+
+    def count(self, key: str, amount: int = 1):
+        with self._lock:
+            self.stats[key] += amount
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are separate writes; avoid Nagle/delayed-ACK stalls
+    disable_nagle_algorithm = True
+    server: MockApiServer
+
+    def log_message(self, format, *args):
+        pass
+
+    # --- Response helpers ---
+
+    def _send_json(self, status: int, body, headers=None):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+        self.server.count("bytes", len(payload))
+
+    def _send_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        self.server.count("bytes", len(data))
+
+    # --- Routing ---
+
+    def do_GET(self):
+        server = self.server
+        faults = server.faults
+        parts = urlsplit(self.path)
+        query = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+        # Everything before "/mono/api" (the tenant domain) is ignored
+        path = parts.path.split("/mono/api", 1)[-1].strip("/")
+        resource = path.split("/", 1)[0]
+        server.count(f"requests:{resource}")
+        with server._lock:
+            server.in_flight += 1
+            in_flight = server.in_flight
+        try:
+            time.sleep(faults.delay())
+            if (
+                faults.max_concurrency and in_flight > faults.max_concurrency
+            ) or faults.roll(faults.rate_429):
+                server.count("injected:429")
+                self._send_json(
+                    429,
+                    {"message": "Too many requests"},
+                    {"Retry-After": str(faults.retry_after)},
+                )
+                return
+            if faults.roll(faults.failure_rate):
+                server.count("injected:500")
+                self._send_json(500, {"message": "Injected failure"})
+                return
+            if resource == "accesstoken":
+                self._token()
+                return
+            if not self._authorized():
+                server.count("unauthorized")
+                self._send_json(401, {"message": "Invalid or expired access token"})
+                return
+            # Document links point back at this server under the same tenant
+            api_root = parts.path.split("/mono/api", 1)[0] + "/mono/api"
+            base_url = f"http://{self.headers.get('Host')}{api_root}"
+            if resource == "employees":
+                self._employees(query, base_url)
+            elif resource == "lists":
+                self._send_json(200, {"list": server.tenant.list_items()})
+            elif resource == "organizations":
+                self._send_json(
+                    200, {"organizations": server.tenant.organization_items()}
+                )
+            elif resource == "documents" and "/" in path:
+                self._document(path.split("/", 1)[1])
+            else:
+                self._send_json(404, {"message": f"Unknown resource: {path}"})
+        finally:
+            with server._lock:
+                server.in_flight -= 1
+
+    def _token(self):
+        if not (self.headers.get("Client-Id") and self.headers.get("Client-Secret")):
+            self._send_json(401, {"message": "Missing client credentials"})
+            return
+        token = secrets.token_hex(16)
+        ttl = self.server.faults.token_ttl
+        with self.server._lock:
+            self.server.tokens[token] = time.monotonic() + ttl
+        self._send_json(200, {"access_token": token, "expires_in": ttl})
+
+    def _authorized(self) -> bool:
+        expires = self.server.tokens.get(self.headers.get("Access-Token", ""))
+        return expires is not None and time.monotonic() < expires
+
+    def _employees(self, query, base_url):
+        tenant = self.server.tenant
+        include_inactive = query.get("includeInactive", "false").lower() == "true"
+        since_date = query.get("timelineSince")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        buf = [b'{"employees":[']
+        size = len(buf[0])
+        first = True
+        for emp in tenant.iter_employees(include_inactive, since_date, base_url):
+            data = json.dumps(emp, ensure_ascii=False).encode("utf-8")
+            if not first:
+                buf.append(b",")
+            buf.append(data)
+            size += len(data) + 1
+            first = False
+            if size >= FLUSH_BYTES:
+                self._send_chunk(b"".join(buf))
+                buf, size = [], 0
+        buf.append(b"]}")
+        self._send_chunk(b"".join(buf))
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _document(self, doc_id: str):
+        content = self.server.tenant.document_content(doc_id)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+        self.server.count("bytes", len(content))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="mock_api", description="Serve a synthetic CatalystOne tenant locally."
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--employees", type=int, default=1000)
+    parser.add_argument(
+        "--fields", type=int, default=20, help="custom fields per employee"
+    )
+    parser.add_argument("--timeline-depth", type=int, default=3)
+    parser.add_argument(
+        "--documents", type=int, default=None, help="default: 2 per employee"
+    )
+    parser.add_argument("--document-size", type=int, default=16 * 1024)
+    parser.add_argument("--shared-documents", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="seconds per request"
+    )
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--max-concurrency", type=int, default=None)
+    parser.add_argument("--token-ttl", type=int, default=3600)
+    args = parser.parse_args(argv)
+
+    tenant = SyntheticTenant(
+        employees=args.employees,
+        fields=args.fields,
+        timeline_depth=args.timeline_depth,
+        documents=args.documents,
+        document_size=args.document_size,
+        shared_documents=args.shared_documents,
+        seed=args.seed,
+    )
+    faults = FaultProfile(
+        latency=args.latency,
+        jitter=args.jitter,
+        rate_429=args.rate_429,
+        failure_rate=args.failure_rate,
+        retry_after=args.retry_after,
+        max_concurrency=args.max_concurrency,
+        token_ttl=args.token_ttl,
+        seed=args.seed,
+    )
+    server = MockApiServer(tenant, faults, args.host, args.port)
+    print(f'TCTOOLBOX_BASE_URL="{server.base_url_template}"')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,484 @@
+# tctoolbox/benchmarks/run.py
+"""Time and measure peak memory of the toolbox hot paths on synthetic tenants.
+
+    python -m benchmarks.run --sizes 1000,10000 --output results.json
+    python -m benchmarks.run --save-baseline          # store benchmarks/baseline.json
+    python -m benchmarks.run --threshold 0.2          # compare against the baseline
+
+Every (case, size) pair runs in a fresh process so peak RSS is not skewed by
+earlier cases; the memory compared against the baseline is what the timed
+operation adds on top of its setup. Exits with status 1 if any case
+regressed past the threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from multiprocessing import get_context
+
+from benchmarks.synthetic import (
+    CUSTOM_FIELD_START,
+    DOCUMENT_FIELDS,
+    SyntheticTenant,
+)
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+DEFAULT_DATA_DIR = os.path.join(tempfile.gettempdir(), "tctoolbox-bench")
+# Timeline window used for the history payload; includes every change
+HISTORY_SINCE = "2000-01-01"
+IDENTIFIER = "0: Profile ID"
+METRICS = ("seconds", "operation_rss_mb")
+
+
+# --- Measurement ---
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(peak / (1024**2 if sys.platform == "darwin" else 1024), 1)
+
+
+def _proc_rss_mb(field: str):
+    """ "VmRSS" (current) or "VmHWM" (peak) of this process in MB, or None
+    where /proc is unavailable."""
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith(f"{field}:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def _reset_peak_rss() -> bool:
+    """Restart the peak RSS from the current RSS (Linux only)."""
+    try:
+        with open("/proc/self/clear_refs", "w", encoding="ascii") as f:
+            f.write("5")
+    except OSError:
+        return False
+    return _proc_rss_mb("VmHWM") is not None
+
+
+def _measure(operation):
+    """Run ``operation``; returns (extras, seconds, MB its peak RSS rose
+    above the RSS it started with)."""
+    if _reset_peak_rss():
+        before = _proc_rss_mb("VmRSS")
+        start = time.perf_counter()
+        extras = operation() or {}
+        seconds = time.perf_counter() - start
+        return extras, seconds, round(_proc_rss_mb("VmHWM") - before, 1)
+    # Elsewhere only the process-wide peak exists: count its growth past setup
+    before = _peak_rss_mb()
+    start = time.perf_counter()
+    extras = operation() or {}
+    seconds = time.perf_counter() - start
+    peak = _peak_rss_mb()
+    return extras, seconds, None if peak is None else round(peak - before, 1)
+
+
+# --- Synthetic inputs ---
+
+
+def _tenant(options, size, **overrides) -> SyntheticTenant:
+    params = dict(
+        employees=size,
+        fields=options["fields"],
+        timeline_depth=options["timeline_depth"],
+        document_size=options["document_size"],
+        seed=options["seed"],
+    )
+    params.update(overrides)
+    return SyntheticTenant(**params)
+
+
+def payload_path(options, size, history: bool) -> str:
+    """Write (once) and return an /employees payload file for ``size``."""
+    name = "employees-{}-f{}-t{}-s{}{}.json".format(
+        size,
+        options["fields"],
+        options["timeline_depth"],
+        options["seed"],
+        "-history" if history else "",
+    )
+    path = os.path.join(options["data_dir"], name)
+    if not os.path.exists(path):
+        os.makedirs(options["data_dir"], exist_ok=True)
+        tenant = _tenant(options, size)
+        since = HISTORY_SINCE if history else None
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write('{"employees":[')
+            for i, emp in enumerate(tenant.iter_employees(True, since)):
+                if i:
+                    f.write(",")
+                f.write(json.dumps(emp, ensure_ascii=False))
+            f.write("]}")
+        os.replace(tmp, path)
+    return path
+
+
+def _stream_payload(path):
+    from core.jsonstream import iter_array
+
+    def chunks():
+        with open(path, "rb") as f:
+            while chunk := f.read(64 * 1024):
+                yield chunk
+
+    return iter_array(chunks(), "employees")
+
+
+def _custom_field_labels(options):
+    return [
+        f"{CUSTOM_FIELD_START + k}: Custom field {k}" for k in range(options["fields"])
+    ]
+
+
+def _document_labels():
+    return [
+        f"{fid}: {name} ({ftype})" for fid, (name, ftype) in DOCUMENT_FIELDS.items()
+    ]
+
+
+def _write_files(folder, count, size, ext):
+    os.makedirs(folder, exist_ok=True)
+    block = os.urandom(size)
+    for i in range(count):
+        with open(os.path.join(folder, f"file{i}{ext}"), "wb") as f:
+            f.write(block)
+
+
+# --- Cases ---
+# Each case takes (options, size, workdir), does its setup and returns the
+# operation to time: a callable returning a dict of extras for the report.
+
+
+def case_load_fields(options, size, workdir):
+    from core.history import aggregate_fields
+
+    path = payload_path(options, size, history=False)
+
+    def run():
+        options_, id_opts = aggregate_fields(_stream_payload(path))
+        return {"fields": len(options_)}
+
+    return run
+
+
+def case_history_export(options, size, workdir):
+    from core.history import build_history_zip
+
+    employees = list(_stream_payload(payload_path(options, size, history=True)))
+    selected = _custom_field_labels(options)
+
+    def run():
+        data = build_history_zip(employees, IDENTIFIER, selected)
+        return {"zip_bytes": len(data)}
+
+    return run
+
+
+def case_history_export_parallel(options, size, workdir):
+    from core.history import write_history_zip
+
+    employees = list(_stream_payload(payload_path(options, size, history=True)))
+    selected = _custom_field_labels(options)
+    target = os.path.join(workdir, "history.zip")
+
+    def run():
+        write_history_zip(
+            employees, IDENTIFIER, selected, target, workers=os.cpu_count() or 1
+        )
+        return {"zip_bytes": os.path.getsize(target)}
+
+    return run
+
+
+def case_count_documents(options, size, workdir):
+    from core.documents import count_documents
+
+    path = payload_path(options, size, history=False)
+
+    def run():
+        return count_documents(_stream_payload(path), _document_labels())
+
+    return run
+
+
+def case_download_documents(options, size, workdir):
+    from benchmarks.mock_api import FaultProfile, MockApiServer
+    from core.api import ApiClient, prune_fields
+    from core.documents import download_documents
+
+    tenant = _tenant(options, size)
+    server = MockApiServer(tenant, FaultProfile(latency=options["latency"])).start()
+    base_url = server.base_url("bench")
+    wanted = set(DOCUMENT_FIELDS) | {IDENTIFIER.split(":")[0]}
+    employees = [
+        prune_fields(emp, wanted)
+        for emp in tenant.iter_employees(True, base_url=base_url)
+    ]
+    client = ApiClient(base_url, "bench", "bench")
+    output = os.path.join(workdir, "documents")
+
+    def run():
+        shutil.rmtree(output, ignore_errors=True)
+        downloaded, total, errors, _ = download_documents(
+            client, employees, _document_labels(), IDENTIFIER, output
+        )
+        return {"documents": total, "downloaded": downloaded, "errors": len(errors)}
+
+    return run
+
+
+def case_zip_person_files(options, size, workdir):
+    from core.zipper import zip_person_files
+
+    folder = os.path.join(workdir, "person")
+    _write_files(folder, max(size // 10, 1), options["document_size"], ".pdf")
+    target = os.path.join(workdir, "person.zip")
+
+    def run():
+        return {"files": zip_person_files(folder, target)}
+
+    return run
+
+
+def case_zipper_folders(options, size, workdir):
+    from core.zipper import zip_document_folders
+
+    root = os.path.join(workdir, "root")
+    for i in range(size):
+        _write_files(
+            os.path.join(root, str(100000 + i)), 2, options["document_size"], ".pdf"
+        )
+    output = os.path.join(workdir, "zips")
+
+    def run():
+        shutil.rmtree(output, ignore_errors=True)
+        os.makedirs(output)
+        items, converted, failed = zip_document_folders(root, output)
+        return {"items": items, "converted": converted}
+
+    return run
+
+
+def case_zipper_photos(options, size, workdir):
+    from core.zipper import zip_photos
+
+    root = os.path.join(workdir, "photos")
+    _write_files(root, size, options["document_size"], ".jpg")
+    output = os.path.join(workdir, "zips")
+
+    def run():
+        shutil.rmtree(output, ignore_errors=True)
+        os.makedirs(output)
+        items, converted, failed = zip_photos(root, output)
+        return {"items": items, "converted": converted}
+
+    return run
+
+
+def case_generate_excel(options, size, workdir):
+    import pandas as pd
+
+    from core.fields import build_excel
+
+    df_fields = pd.DataFrame(
+        [{"ID": i, "Name": f"Field {i}", "Type": "TEXT"} for i in range(size)]
+    )
+    df_lists = pd.DataFrame(
+        [{"ID": i, "Name": f"Scale {i}"} for i in range(size // 10)]
+    )
+    df_orgs = pd.DataFrame([{"ID": i, "Name": f"Field {i}"} for i in range(size // 10)])
+
+    def run():
+        return {"xlsx_bytes": len(build_excel(df_fields, df_lists, df_orgs).getvalue())}
+
+    return run
+
+
+CASES = {
+    "load_fields": case_load_fields,
+    "history_export": case_history_export,
+    "history_export_parallel": case_history_export_parallel,
+    "count_documents": case_count_documents,
+    "download_documents": case_download_documents,
+    "zip_person_files": case_zip_person_files,
+    "zipper_folders": case_zipper_folders,
+    "zipper_photos": case_zipper_photos,
+    "generate_excel": case_generate_excel,
+}
+
+
+def run_case(name, size, options) -> dict:
+    """Run one case in the current process; meant for a fresh worker process."""
+    workdir = tempfile.mkdtemp(prefix=f"tctoolbox-bench-{name}-")
+    try:
+        operation = CASES[name](options, size, workdir)
+        setup_rss = _peak_rss_mb()
+        timings = []
+        growth = []
+        extras = {}
+        for _ in range(options["repeat"]):
+            extras, seconds, rss = _measure(operation)
+            timings.append(seconds)
+            growth.append(rss)
+        result = {
+            "case": name,
+            "size": size,
+            "seconds": round(min(timings), 4),
+            "operation_rss_mb": None if None in growth else max(growth),
+            "peak_rss_mb": _peak_rss_mb(),
+            "setup_rss_mb": setup_rss,
+        }
+        result.update(extras)
+        return result
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+# --- Baseline comparison ---
+
+
+def compare(results, baseline, threshold):
+    """Return a list of regressions of ``results`` against ``baseline``."""
+    previous = {(r["case"], r["size"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for result in results:
+        base = previous.get((result["case"], result["size"]))
+        if not base:
+            continue
+        for metric in METRICS:
+            old, new = base.get(metric), result.get(metric)
+            if old and new is not None and new > old * (1 + threshold):
+                regressions.append(
+                    {
+                        "case": result["case"],
+                        "size": result["size"],
+                        "metric": metric,
+                        "baseline": old,
+                        "current": new,
+                        "change": round(new / old - 1, 3),
+                    }
+                )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="benchmarks.run", description=__doc__.split("\n")[0]
+    )
+    parser.add_argument(
+        "--sizes",
+        default=",".join(str(s) for s in DEFAULT_SIZES),
+        help="comma-separated employee counts (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--cases", default="all", help=f"comma-separated subset of: {', '.join(CASES)}"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=1, help="runs per case; best time is kept"
+    )
+    parser.add_argument(
+        "--fields", type=int, default=10, help="custom fields per employee"
+    )
+    parser.add_argument("--timeline-depth", type=int, default=3)
+    parser.add_argument("--document-size", type=int, default=4096)
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="mock API latency (s)"
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR, help="cached payloads")
+    parser.add_argument("--output", help="write results JSON here (default: stdout)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument(
+        "--save-baseline", action="store_true", help="store results as the baseline"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="flag regressions above this relative increase (default: %(default)s)",
+    )
+    args = parser.parse_args(argv)
+
+    cases = list(CASES) if args.cases == "all" else args.cases.split(",")
+    unknown = [c for c in cases if c not in CASES]
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(unknown)}")
+    sizes = [int(s) for s in args.sizes.split(",")]
+    options = {
+        "fields": args.fields,
+        "timeline_depth": args.timeline_depth,
+        "document_size": args.document_size,
+        "latency": args.latency,
+        "seed": args.seed,
+        "data_dir": args.data_dir,
+        "repeat": max(args.repeat, 1),
+    }
+
+    results = []
+    for size in sizes:
+        for name in cases:
+            print(f"{name} @ {size} ...", file=sys.stderr, flush=True)
+            with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as pool:
+                result = pool.submit(run_case, name, size, options).result()
+            print(
+                f"  {result['seconds']:.3f}s, +{result['operation_rss_mb']} MB "
+                f"(peak {result['peak_rss_mb']} MB)",
+                file=sys.stderr,
+            )
+            results.append(result)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "options": {k: v for k, v in options.items() if k != "data_dir"},
+        },
+        "results": results,
+    }
+    regressions = []
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        report["regressions"] = regressions
+        for reg in regressions:
+            print(
+                f"REGRESSION {reg['case']} @ {reg['size']}: {reg['metric']} "
+                f"{reg['baseline']} -> {reg['current']} (+{reg['change']:.0%})",
+                file=sys.stderr,
+            )
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"Baseline saved to {args.baseline}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
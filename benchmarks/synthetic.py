@@ -0,0 +1,214 @@
+# tctoolbox/benchmarks/synthetic.py
+import random
+
+# --- Field layout of a synthetic employee ---
+
+IDENTIFIER_FIELDS = {
+    "0": "Profile ID",
+    "7": "E-mail",
+    "47": "Employee ID",
+    "101": "Username",
+}
+DOC_SINGLE_FID = "500"
+DOC_MULTIPLE_FID = "501"
+PHOTO_FID = "502"
+DOCUMENT_FIELDS = {
+    DOC_SINGLE_FID: ("Contract", "DOCUMENTSINGLE"),
+    DOC_MULTIPLE_FID: ("Certificates", "DOCUMENTMULTIPLE"),
+    PHOTO_FID: ("Photo", "PHOTO"),
+}
+# Custom fields start here; every fifth one is a multi-value list field
+CUSTOM_FIELD_START = 1000
+FIRST_NAMES = ("Anna", "Erik", "Maria", "Lars", "Karin", "Johan", "Sara", "Nils")
+LAST_NAMES = ("Andersson", "Johansson", "Karlsson", "Nilsson", "Eriksson", "Larsson")
+EXTENSIONS = ("pdf", "docx", "txt", "xlsx")
+
+
+def _below(rng, n: int) -> int:
+    # Much cheaper than randint() and good enough for synthetic data
+    return int(rng.random() * n)
+
+
+class SyntheticTenant:
+    """Seeded, deterministic generator of a CatalystOne-like tenant.
+
+    Employees are generated on demand from ``seed`` and their index, so a
+    100k-employee tenant can be served or iterated without holding it in
+    memory, and every run sees exactly the same data.
+    """
+
+    def __init__(
+        self,
+        employees=1000,
+        fields=20,
+        timeline_depth=3,
+        documents=None,
+        document_size=16 * 1024,
+        shared_documents=0.0,
+        inactive_ratio=0.1,
+        lists=50,
+        organizations=20,
+        seed=42,
+    ):
+        self.employees = employees
+        self.fields = fields
+        self.timeline_depth = timeline_depth
+        # Default: two documents per employee
+        self.documents = 2 * employees if documents is None else documents
+        self.document_size = document_size
+        # Share of documents pointing at one of a few tenant-wide files
+        self.shared_documents = shared_documents
+        self.inactive_ratio = inactive_ratio
+        self.lists = lists
+        self.organizations = organizations
+        self.seed = seed
+        self._block = random.Random(seed).randbytes(max(document_size, 1))
+
+    # --- Employees ---
+
+    def is_active(self, index: int) -> bool:
+        return (
+            random.Random(f"{self.seed}:active:{index}").random() >= self.inactive_ratio
+        )
+
+    def _document_ids(self, index: int) -> list:
+        per, extra = divmod(self.documents, self.employees or 1)
+        start = index * per + min(index, extra)
+        count = per + (1 if index < extra else 0)
+        rng = random.Random(f"{self.seed}:docs:{index}")
+        ids = []
+        for doc_id in range(start, start + count):
+            if rng.random() < self.shared_documents:
+                ids.append(f"shared-{rng.randrange(5)}")
+            else:
+                ids.append(str(doc_id))
+        return ids
+
+    def _timeline(self, rng, since_date, value_fn) -> list:
+        # Values are drawn for every change before filtering on since_date,
+        # so the same employee has the same history whatever the window
+        changes = []
+        year = 2015
+        for depth in range(self.timeline_depth):
+            valid_from = f"{year}-{_below(rng, 12) + 1:02d}-01"
+            year += 1 + _below(rng, 2)
+            last = depth == self.timeline_depth - 1
+            valid_to = "" if last else f"{year}-01-01"
+            change = {
+                "data": value_fn(depth),
+                "dataValidFrom": valid_from,
+                "lastModified": f"{valid_from}T08:00:00Z",
+            }
+            if valid_to:
+                change["dataValidTo"] = valid_to
+            if not (since_date and valid_to and valid_to < since_date):
+                changes.append(change)
+        return changes
+
+    def employee(self, index: int, base_url="", since_date=None) -> dict:
+        rng = random.Random(f"{self.seed}:emp:{index}")
+        first = rng.choice(FIRST_NAMES)
+        last = rng.choice(LAST_NAMES)
+        username = f"{first.lower()}.{last.lower()}{index}"
+        field = {}
+        id_values = {
+            "0": str(100000 + index),
+            "7": f"{username}@example.com",
+            "47": f"E{index:06d}",
+            "101": username,
+        }
+        for fid, name in IDENTIFIER_FIELDS.items():
+            field[fid] = {
+                "name": name,
+                "type": "TEXT",
+                "data": {"value": id_values[fid]},
+            }
+        for k in range(self.fields):
+            fid = str(CUSTOM_FIELD_START + k)
+            multi = k % 5 == 4
+            if multi:
+
+                def value_fn(depth, k=k):
+                    return [{"value": f"Option {k}.{depth}.{j}"} for j in range(2)]
+
+            else:
+
+                def value_fn(depth, k=k):
+                    return {"value": f"Value {k}.{depth}.{_below(rng, 1000)}"}
+
+            entry = {
+                "name": f"Custom field {k}",
+                "type": "MULTILIST" if multi else "TEXT",
+                "data": value_fn(self.timeline_depth),
+            }
+            if since_date is not None:
+                entry["timelineChange"] = self._timeline(rng, since_date, value_fn)
+            field[fid] = entry
+        doc_ids = self._document_ids(index)
+        documents = [self.document_meta(doc_id, base_url) for doc_id in doc_ids]
+        if documents:
+            field[PHOTO_FID] = {
+                "name": DOCUMENT_FIELDS[PHOTO_FID][0],
+                "type": "PHOTO",
+                "data": dict(documents[0], extension="jpg", title="photo"),
+            }
+        if len(documents) > 1:
+            field[DOC_SINGLE_FID] = {
+                "name": DOCUMENT_FIELDS[DOC_SINGLE_FID][0],
+                "type": "DOCUMENTSINGLE",
+                "data": documents[1],
+            }
+        if len(documents) > 2:
+            field[DOC_MULTIPLE_FID] = {
+                "name": DOCUMENT_FIELDS[DOC_MULTIPLE_FID][0],
+                "type": "DOCUMENTMULTIPLE",
+                "data": documents[2:],
+            }
+        return {
+            "username": username,
+            "name": f"{first} {last}",
+            "active": self.is_active(index),
+            "field": field,
+        }
+
+    def iter_employees(self, include_inactive=False, since_date=None, base_url=""):
+        for index in range(self.employees):
+            if include_inactive or self.is_active(index):
+                yield self.employee(index, base_url, since_date)
+
+    # --- Documents ---
+
+    def document_meta(self, doc_id: str, base_url="") -> dict:
+        rng = random.Random(f"{self.seed}:doc:{doc_id}")
+        return {
+            "title": f"Document {doc_id}",
+            "extension": rng.choice(EXTENSIONS),
+            "link": {"href": f"{base_url}/documents/{doc_id}"},
+        }
+
+    def document_content(self, doc_id: str) -> bytes:
+        header = f"document {doc_id}\n".encode()
+        return header + self._block[: max(self.document_size - len(header), 0)]
+
+    # --- Other resources ---
+
+    def list_items(self) -> list:
+        return [
+            {
+                "id": str(i),
+                "scale": {"id": str(i // 3 + 1), "name": f"Scale {i // 3 + 1}"},
+            }
+            for i in range(self.lists)
+        ]
+
+    def organization_items(self) -> list:
+        return [
+            {
+                "id": str(i),
+                "field": {
+                    "1": {"name": "Name", "data": {"value": f"Unit {i}"}},
+                    "2": {"name": "Cost center", "data": {"value": str(4000 + i)}},
+                },
+            }
+            for i in range(self.organizations)
+        ]
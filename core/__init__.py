@@ -0,0 +1,2 @@
+# tctoolbox/core/__init__.py
+# Building blocks shared by the pages. Only core.session depends on Streamlit.
@@ -0,0 +1,288 @@
+# tctoolbox/core/api.py
+import http.cookiejar
+import os
+import threading
+import time
+import weakref
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from core.jsonstream import iter_array
+from core.retry import (
+    THROTTLE_STATUSES,
+    AdaptiveLimiter,
+    RetryPolicy,
+    TokenBucket,
+    limiter_for,
+)
+from core.tokens import TokenManager
+
+# --- Connection defaults ---
+
+API_VERSION = "v3"
+# Matches the maximum of the adaptive concurrency limit (core.retry)
+DEFAULT_POOL_SIZE = 32
+# (connect, read) in seconds; /employees on a large tenant can take minutes
+DEFAULT_TIMEOUT = (10, 300)
+# Bytes read per chunk when streaming large payloads
+STREAM_CHUNK_SIZE = 64 * 1024
+DEFAULT_HEADERS = {
+    "Api-Version": API_VERSION,
+    "Accept": "application/json",
+}
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+# Tenant URL; TCTOOLBOX_BASE_URL overrides it, e.g. for the local mock API
+# ("http://127.0.0.1:8765/{domain}/mono/api")
+BASE_URL_TEMPLATE = "https://{domain}.catalystone.com/mono/api"
+
+
+def base_url_for(domain: str) -> str:
+    template = os.environ.get("TCTOOLBOX_BASE_URL") or BASE_URL_TEMPLATE
+    return template.format(domain=domain.strip())
+
+
+def get_session(pool_size: int = DEFAULT_POOL_SIZE) -> requests.Session:
+    """Return the process-wide keep-alive session for ``pool_size``.
+
+    Sessions are shared across pages and reruns, so TCP/TLS connections to a
+    tenant are reused instead of re-negotiated on every request. They keep no
+    cookies: the API authenticates with headers, and a shared jar would hand
+    one user's cookies to every other user of the tenant.
+    """
+    with _sessions_lock:
+        session = _sessions.get(pool_size)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update(DEFAULT_HEADERS)
+            session.cookies.set_policy(
+                http.cookiejar.DefaultCookiePolicy(allowed_domains=[])
+            )
+            _sessions[pool_size] = session
+        return session
+
+
+class ApiClient:
+    """Small wrapper around the CatalystOne API using a pooled session."""
+
+    def __init__(
+        self,
+        base_url: str,
+        client_id: str,
+        client_secret: str,
+        tokens: TokenManager = None,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        timeout=DEFAULT_TIMEOUT,
+        headers: dict = None,
+        retry: RetryPolicy = None,
+        limiter: AdaptiveLimiter = None,
+        bandwidth: TokenBucket = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.client_id = client_id.strip()
+        self.client_secret = client_secret.strip()
+        self.timeout = timeout
+        self.headers = dict(headers or {})
+        self.session = get_session(pool_size)
+        self.tokens = tokens if tokens is not None else TokenManager()
+        self.retry = retry or RetryPolicy()
+        # Shared by every client of the same tenant in this process
+        self.limiter = limiter or limiter_for(self.base_url)
+        # Optional cap on bytes/s read through this client (see core.jobs)
+        self.bandwidth = bandwidth
+
+    # --- Authentication ---
+
+    def request_token(self) -> dict:
+        """Request a new access token; returns the raw /accesstoken payload."""
+        headers = {
+            "Client-Id": self.client_id,
+            "Client-Secret": self.client_secret,
+            "Grant-Type": "client_credentials",
+        }
+        resp = self.send(f"{self.base_url}/accesstoken", headers)
+        resp.raise_for_status()
+        data = resp.json()
+        if not data.get("access_token"):
+            raise ValueError(f"No access_token in response: {data}")
+        return data
+
+    @property
+    def token(self) -> str:
+        return self.tokens.get(self)
+
+    # --- Requests ---
+
+    def url(self, path: str) -> str:
+        if path.startswith(("http://", "https://")):
+            return path
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def _attempt(
+        self, url: str, headers: dict, params: dict = None, stream=False, hold=True
+    ):
+        """One GET in a slot of the tenant's limiter, released however the
+        request ends; only connection failures count as throttling.
+
+        A ``stream`` response keeps its slot until it is closed (unless
+        ``hold`` is False), so bodies are read within the limit and the
+        latency sample covers the body.
+        """
+        self.limiter.acquire()
+        start = time.monotonic()
+        throttled, latency = False, None
+        held = False
+        try:
+            resp = self.session.get(
+                url,
+                headers=headers,
+                params=params,
+                stream=stream,
+                timeout=self.timeout,
+            )
+            throttled = resp.status_code in THROTTLE_STATUSES
+            latency = time.monotonic() - start
+            if stream and hold:
+                _hold_slot(self.limiter, resp, start, throttled)
+                held = True
+            return resp
+        except (requests.ConnectionError, requests.Timeout):
+            throttled = True
+            raise
+        finally:
+            if not held:
+                self.limiter.release(throttled=throttled, latency=latency)
+
+    def send(
+        self, url: str, headers: dict, params: dict = None, stream=False, hold=True
+    ):
+        """GET ``url`` within the tenant's concurrency limit, retrying
+        throttled, transient and connection failures per ``self.retry``
+        (see _attempt for ``stream`` and ``hold``)."""
+        attempt = 0
+        while True:
+            try:
+                resp = self._attempt(url, headers, params, stream, hold)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.retry.max_retries:
+                    raise
+                time.sleep(self.retry.delay(attempt))
+                attempt += 1
+                continue
+            if (
+                resp.status_code not in self.retry.statuses
+                or attempt >= self.retry.max_retries
+            ):
+                return resp
+            delay = self.retry.delay(attempt, resp)
+            resp.close()
+            time.sleep(delay)
+            attempt += 1
+
+    def get(
+        self, path: str, params: dict = None, stream: bool = False, hold: bool = True
+    ):
+        """GET ``path`` (relative to the API root, or an absolute link).
+
+        A 401 invalidates the cached token and the request is retried once
+        with a fresh one.
+        """
+        headers = dict(self.headers)
+        for attempt in range(2):
+            token = self.token
+            headers["Access-Token"] = token
+            resp = self.send(
+                self.url(path), headers, params=params, stream=stream, hold=hold
+            )
+            if resp.status_code == 401 and attempt == 0:
+                resp.close()
+                self.tokens.invalidate(self, token)
+                continue
+            break
+        resp.raise_for_status()
+        if self.bandwidth is not None and not stream:
+            self.bandwidth.consume(len(resp.content))
+        return resp
+
+    def iter_content(self, resp, chunk_size=STREAM_CHUNK_SIZE):
+        """Yield the body of a ``stream=True`` response in chunks of
+        ``chunk_size`` bytes, no faster than ``self.bandwidth`` allows."""
+        chunks = resp.iter_content(chunk_size=chunk_size)
+        if self.bandwidth is not None:
+            chunks = self.bandwidth.throttle(chunks)
+        return chunks
+
+    def get_json(self, path: str, params: dict = None):
+        return self.get(path, params=params).json()
+
+    # --- Resources ---
+
+    def iter_employees(self, include_inactive=False, since_date=None, fields=None):
+        """Stream /employees and return a generator yielding one employee at a time.
+
+        The request is sent (and HTTP errors raised) immediately; the body is
+        parsed incrementally as the generator is consumed, so peak memory
+        depends on the largest single employee rather than on the tenant.
+        If ``fields`` is given, only those field IDs are kept on each employee
+        (the API has no projection, so they are pruned as items are parsed).
+        """
+        params = {}
+        if include_inactive:
+            params["includeInactive"] = "true"
+        if since_date:
+            params["timelineSince"] = since_date
+        if fields is not None:
+            fields = {str(fid) for fid in fields}
+        # Employees are consumed while their documents are fetched from the
+        # same tenant; holding a slot for the whole stream could starve them
+        resp = self.get("employees", params=params, stream=True, hold=False)
+        return _iter_streamed(resp, "employees", fields, self.bandwidth)
+
+
+def prune_fields(emp: dict, fields) -> dict:
+    """Drop every entry of ``emp["field"]`` whose ID is not in ``fields``."""
+    field = emp.get("field")
+    if isinstance(field, dict):
+        emp["field"] = {fid: fld for fid, fld in field.items() if fid in fields}
+    return emp
+
+
+def _hold_slot(limiter, resp, start: float, throttled: bool) -> None:
+    """Release ``limiter``'s slot when ``resp`` is closed (or, should a
+    caller drop it unclosed, garbage collected)."""
+    once = threading.Lock()
+
+    def release():
+        if once.acquire(blocking=False):
+            limiter.release(throttled=throttled, latency=time.monotonic() - start)
+
+    close = resp.close
+
+    def close_and_release():
+        try:
+            close()
+        finally:
+            release()
+
+    resp.close = close_and_release
+    weakref.finalize(resp, release)
+
+
+def _iter_streamed(resp, key: str, fields=None, bandwidth=None):
+    try:
+        chunks = resp.iter_content(chunk_size=STREAM_CHUNK_SIZE)
+        if bandwidth is not None:
+            chunks = bandwidth.throttle(chunks)
+        for item in iter_array(chunks, key):
+            if fields is not None and isinstance(item, dict):
+                prune_fields(item, fields)
+            yield item
+    finally:
+        resp.close()
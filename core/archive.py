@@ -0,0 +1,138 @@
+# tctoolbox/core/archive.py
+import multiprocessing
+import os
+import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+# Each member is deflated in blocks of this size; every block is primed with
+# the preceding DICTIONARY_SIZE bytes so the ratio matches a single stream
+BLOCK_SIZE = 1024 * 1024
+DICTIONARY_SIZE = 32 * 1024
+READ_SIZE = 1024 * 1024
+# Peak memory of one compression process: a spawned interpreter re-imports
+# the app's modules (about 125 MB with Streamlit and pandas loaded)
+PROCESS_MEMORY = 128 * 1024**2
+
+COMPRESSION_METHODS = {
+    "deflate": zipfile.ZIP_DEFLATED,
+    "store": zipfile.ZIP_STORED,
+}
+
+
+def _deflate_block(path: str, offset: int, length: int, level: int, last: bool):
+    """Compress one block of a file to raw deflate data (runs in a worker)."""
+    start = max(0, offset - DICTIONARY_SIZE)
+    with open(path, "rb") as f:
+        f.seek(start)
+        zdict = f.read(offset - start)
+        data = f.read(length)
+    if zdict:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15, zdict=zdict)
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    # A sync flush ends the block on a byte boundary without closing the
+    # stream, so the blocks concatenate into one valid deflate stream
+    head = compressor.compress(data)
+    return head + compressor.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+def _file_crc(path: str) -> int:
+    crc = 0
+    with open(path, "rb") as f:
+        while chunk := f.read(READ_SIZE):
+            crc = zlib.crc32(chunk, crc)
+    return crc
+
+
+def _write_precompressed(zip_file, path, arcname, blocks):
+    """Add ``path`` to ``zip_file`` from already deflated ``blocks``.
+
+    ZipFile has no public API for precompressed data, so this mirrors what
+    ZipFile.open(..., "w") does on a seekable file: write a placeholder local
+    header, the data, then seek back and rewrite the header with the CRC and
+    sizes.
+    """
+    zinfo = zipfile.ZipInfo.from_file(path, arcname)
+    zinfo.compress_type = zipfile.ZIP_DEFLATED
+    zinfo.compress_size = 0
+    zinfo.CRC = 0
+    if not zinfo.external_attr:
+        zinfo.external_attr = 0o600 << 16
+    # Compressed size can be larger than uncompressed size
+    zip64 = zinfo.file_size * 1.05 > zipfile.ZIP64_LIMIT
+
+    fp = zip_file.fp
+    fp.seek(zip_file.start_dir)
+    zinfo.header_offset = fp.tell()
+    zip_file._writecheck(zinfo)
+    zip_file._didModify = True
+    fp.write(zinfo.FileHeader(zip64))
+
+    for block in blocks:
+        fp.write(block)
+        zinfo.compress_size += len(block)
+    zinfo.CRC = _file_crc(path)
+    if not zip64 and zinfo.compress_size > zipfile.ZIP64_LIMIT:
+        raise RuntimeError(f"Compressed size of {arcname} requires ZIP64")
+
+    zip_file.start_dir = fp.tell()
+    fp.seek(zinfo.header_offset)
+    fp.write(zinfo.FileHeader(zip64))
+    fp.seek(zip_file.start_dir)
+    zip_file.filelist.append(zinfo)
+    zip_file.NameToInfo[zinfo.filename] = zinfo
+
+
+def add_files(zip_file: zipfile.ZipFile, files, workers: int = 1) -> None:
+    """Add ``files`` ((path, arcname) pairs) to an open ZipFile, in order.
+
+    With ``workers`` > 1 and a deflated archive, members are split into
+    blocks that are compressed in parallel on a process pool and written
+    as raw streams, so compression time scales with cores. The result is a
+    standard ZIP that any unzip tool reads. Otherwise this is ZipFile.write.
+    """
+    if (
+        workers <= 1
+        or zip_file.compression != zipfile.ZIP_DEFLATED
+        or not zip_file._seekable
+    ):
+        for path, arcname in files:
+            zip_file.write(path, arcname)
+        return
+
+    level = zip_file.compresslevel
+    if level is None:
+        level = zlib.Z_DEFAULT_COMPRESSION
+    # Spawn rather than fork: the app process runs Streamlit's threads
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(workers, mp_context=context) as pool:
+        for path, arcname in files:
+            size = os.path.getsize(path)
+            offsets = range(0, max(size, 1), BLOCK_SIZE)
+            _write_precompressed(
+                zip_file, path, arcname, _pipeline(pool, path, offsets, level, workers)
+            )
+
+
+def compression_memory(workers: int) -> int:
+    """Memory add_files needs with ``workers``, on top of its caller: the
+    worker processes and the blocks (read and compressed) in flight."""
+    if workers <= 1:
+        return 0
+    return workers * PROCESS_MEMORY + workers * 2 * 2 * BLOCK_SIZE
+
+
+def _pipeline(pool, path, offsets, level, workers):
+    """Yield compressed blocks in order, keeping a few per worker in flight."""
+    pending = deque()
+    last = offsets[-1]
+    for offset in offsets:
+        pending.append(
+            pool.submit(_deflate_block, path, offset, BLOCK_SIZE, level, offset == last)
+        )
+        if len(pending) >= workers * 2:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
@@ -0,0 +1,98 @@
+# tctoolbox/core/asof.py
+import csv
+from bisect import bisect_right
+from datetime import datetime
+
+from core.history import _entry_value
+
+
+def parse_dates(text: str) -> list:
+    """Parse comma or space separated yyyy-MM-dd dates, sorted and unique."""
+    dates = set()
+    for part in text.replace(",", " ").split():
+        try:
+            dates.add(datetime.strptime(part, "%Y-%m-%d").strftime("%Y-%m-%d"))
+        except ValueError:
+            raise ValueError(f"Invalid date {part!r} (expected yyyy-MM-dd)") from None
+    if not dates:
+        raise ValueError("Enter at least one date (yyyy-MM-dd).")
+    return sorted(dates)
+
+
+def _day(value) -> str:
+    # Dates compare as "yyyy-MM-dd" strings; datetimes are cut to their day
+    return (value or "")[:10]
+
+
+class IntervalIndex:
+    """The validity intervals of one field's timeline, sorted by start.
+
+    Built once per employee and field (one sort of its entries); ``at``
+    is then a binary search, so looking up many dates costs little more
+    than looking up one.
+    """
+
+    def __init__(self, entries):
+        spans = sorted(
+            (
+                (
+                    _day(rec.get("dataValidFrom") or rec.get("lastModified")),
+                    _day(rec.get("dataValidTo")),
+                    _entry_value(rec.get("data")),
+                )
+                for rec in entries
+            ),
+            # Stable on equal starts: the later entry of the timeline wins
+            key=lambda span: span[0],
+        )
+        self.starts = [span[0] for span in spans]
+        self.ends = [span[1] for span in spans]
+        self.values = [span[2] for span in spans]
+
+    def at(self, date: str) -> str:
+        """Value valid on ``date`` (yyyy-MM-dd), or "" if there was none.
+
+        That is the entry that started last on or before the date, unless it
+        ended before it ("Valid To" is inclusive; blank means still valid).
+        """
+        i = bisect_right(self.starts, date) - 1
+        if i < 0:
+            return ""
+        end = self.ends[i]
+        if end and end < date:
+            return ""
+        return self.values[i]
+
+
+def asof_rows(employees, identifier: str, selected_fields, dates):
+    """Yield one row per employee and date: the date, identifier, name,
+    username and the value of each selected field on that date.
+
+    ``employees`` (with timelines reaching back to the earliest date) is
+    consumed in a single pass; every field timeline is indexed once and
+    then queried for all ``dates``.
+    """
+    id_fid = identifier.split(": ", 1)[0]
+    fids = [item.split(": ", 1)[0] for item in selected_fields]
+    for emp in employees:
+        fields = emp.get("field", {})
+        id_val = fields.get(id_fid, {}).get("data", {}).get("value", "")
+        name = emp.get("name")
+        username = emp.get("username")
+        indexes = [
+            IntervalIndex(fields.get(fid, {}).get("timelineChange") or [])
+            for fid in fids
+        ]
+        for date in dates:
+            yield [date, id_val, name, username, *(ix.at(date) for ix in indexes)]
+
+
+def write_asof_csv(employees, identifier: str, selected_fields, dates, target):
+    """Write the as-of snapshot of ``selected_fields`` for ``dates`` to a
+    semicolon CSV at ``target``, one wide row per employee and date."""
+    id_name = identifier.split(": ", 1)[1]
+    fnames = [item.split(": ", 1)[1] for item in selected_fields]
+    with open(target, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f, delimiter=";")
+        writer.writerow(["As Of", id_name, "Name", "Username", *fnames])
+        writer.writerows(asof_rows(employees, identifier, selected_fields, dates))
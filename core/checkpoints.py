@@ -0,0 +1,160 @@
+# tctoolbox/core/checkpoints.py
+import copy
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+from core.snapshots import _slug
+
+DEFAULT_CHECKPOINT_DIR = os.environ.get("TCTOOLBOX_CHECKPOINT_DIR") or os.path.join(
+    os.path.expanduser("~"), ".cache", "tctoolbox", "checkpoints"
+)
+SUFFIX = ".json.gz"
+
+
+def entry_hash(rec) -> str:
+    """Short stable hash of one timeline entry."""
+    raw = json.dumps(rec, sort_keys=True, ensure_ascii=False)
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def _parse_time(value):
+    try:
+        parsed = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+class HistoryCheckpoint:
+    """Where the last Historical Export of a tenant and field selection ended.
+
+    Holds the time of the last run and, per employee and field, a hash of the
+    last timeline entry. A delta run fetches timelines from the checkpoint
+    date only and passes employees through ``filter``, which keeps just the
+    entries changed since then; ``save`` then stores the new state.
+    """
+
+    def __init__(self, path, last_run=None, hashes=None):
+        self.path = path
+        self.last_run = last_run
+        self.hashes = hashes or {}
+        self._seen = {}
+        self._started = None
+
+    @staticmethod
+    def path_for(
+        client,
+        identifier,
+        selected_fields,
+        include_inactive=False,
+        directory=DEFAULT_CHECKPOINT_DIR,
+    ) -> str:
+        raw = json.dumps(
+            [
+                client.base_url,
+                client.client_id,
+                identifier.split(": ", 1)[0],
+                sorted(item.split(": ", 1)[0] for item in selected_fields),
+                bool(include_inactive),
+            ]
+        )
+        digest = hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+        return os.path.join(directory, f"{_slug(client.base_url)}-{digest}{SUFFIX}")
+
+    @classmethod
+    def load(cls, client, identifier, selected_fields, include_inactive=False, **kw):
+        """Load the checkpoint for this export, or an empty one if there is none."""
+        path = cls.path_for(client, identifier, selected_fields, include_inactive, **kw)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return cls(path)
+        return cls(path, _parse_time(state.get("last_run")), state.get("hashes"))
+
+    @property
+    def since_date(self):
+        """timelineSince for a delta run (a day early, as the API filters by
+        date), or None when there is no previous run."""
+        if self.last_run is None:
+            return None
+        return (self.last_run - timedelta(days=1)).strftime("%Y-%m-%d")
+
+    # --- Delta ---
+
+    def _changed(self, changes, previous):
+        if not changes or previous == entry_hash(changes[-1]):
+            return []
+        if previous is None or self.last_run is None:
+            # New employee or field: everything in the window is new
+            return changes
+        for index, rec in enumerate(changes):
+            modified = _parse_time(rec.get("lastModified"))
+            if modified is None or modified >= self.last_run:
+                # The entry before the first new one was closed by it
+                return changes[max(index - 1, 0) :]
+        # The last entry changed without a newer timestamp (e.g. it was closed)
+        return changes[-1:]
+
+    def filter(self, employees, identifier, selected_fields):
+        """Yield copies of ``employees`` holding only timeline entries changed
+        since the checkpoint; employees without changes are skipped."""
+        self._started = datetime.now(timezone.utc)
+        self._seen = {}
+        id_fid = identifier.split(": ", 1)[0]
+        fids = [item.split(": ", 1)[0] for item in selected_fields]
+        for emp in employees:
+            fields = emp.get("field", {})
+            key = fields.get(id_fid, {}).get("data", {}).get("value") or emp.get(
+                "username", ""
+            )
+            previous = self.hashes.get(key, {})
+            seen = self._seen[key] = {}
+            delta = {}
+            for fid in fids:
+                changes = fields.get(fid, {}).get("timelineChange") or []
+                if changes:
+                    seen[fid] = entry_hash(changes[-1])
+                kept = self._changed(changes, previous.get(fid))
+                if kept:
+                    delta[fid] = kept
+            if not delta:
+                continue
+            out = copy.copy(emp)
+            out["field"] = dict(fields)
+            for fid in fids:
+                if fid in fields:
+                    out["field"][fid] = dict(
+                        fields[fid], timelineChange=delta.get(fid, [])
+                    )
+            yield out
+
+    def save(self):
+        """Persist the state seen by the last ``filter`` pass (call only after
+        the export succeeded)."""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        state = {"last_run": self._started.isoformat(), "hashes": self._seen}
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix=".tmp")
+        os.close(fd)
+        try:
+            with gzip.open(tmp, "wt", encoding="utf-8") as f:
+                json.dump(state, f, separators=(",", ":"))
+            os.replace(tmp, self.path)
+        except BaseException:
+            os.remove(tmp)
+            raise
+        self.last_run, self.hashes = self._started, self._seen
+
+    def reset(self):
+        """Forget the checkpoint; the next run exports the full history."""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        self.last_run, self.hashes = None, {}
@@ -0,0 +1,62 @@
+# tctoolbox/core/exports.py
+import os
+import tempfile
+import time
+
+# Finished exports waiting for download; removed once older than EXPORT_TTL
+EXPORT_DIR = os.environ.get("TCTOOLBOX_EXPORT_DIR") or os.path.join(
+    tempfile.gettempdir(), "tctoolbox-exports"
+)
+EXPORT_TTL = 2 * 60 * 60
+# Page renders purge expired exports at most this often (seconds)
+PURGE_INTERVAL = 60
+_last_purge = 0.0
+
+
+def purge_exports(ttl=EXPORT_TTL, directory=EXPORT_DIR) -> int:
+    """Delete export files older than ``ttl`` seconds. Returns how many were removed."""
+    removed = 0
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return 0
+    cutoff = time.time() - ttl
+    for name in names:
+        path = os.path.join(directory, name)
+        try:
+            if os.path.isfile(path) and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+def purge_exports_due(interval=PURGE_INTERVAL, directory=EXPORT_DIR) -> int:
+    """Run purge_exports if the last check was over ``interval`` seconds ago.
+
+    Called on every page render, so expired exports go even when nobody
+    starts a new one. Returns how many were removed.
+    """
+    global _last_purge
+    now = time.monotonic()
+    if now - _last_purge < interval:
+        return 0
+    _last_purge = now
+    return purge_exports(directory=directory)
+
+
+def new_export_path(suffix: str, directory=EXPORT_DIR) -> str:
+    """Reserve a unique file for a new export, purging expired ones first."""
+    purge_exports(directory=directory)
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    fd, path = tempfile.mkstemp(prefix="export-", suffix=suffix, dir=directory)
+    os.close(fd)
+    return path
+
+
+def read_export(path: str) -> bytes:
+    """Read a finished export; used as a deferred download so the bytes are only
+    loaded when the user actually clicks the button."""
+    with open(path, "rb") as f:
+        return f.read()
@@ -0,0 +1,146 @@
+# tctoolbox/core/fields.py
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+import pandas as pd
+from openpyxl.styles import Alignment
+
+from core.snapshots import iter_employees_cached
+
+WARNING_TEMPLATE = (
+    "⚠️ Failed to fetch {} resource: "
+    "Please check API configuration or download file anyway."
+)
+
+
+def _sorted_by_id(rows, columns) -> pd.DataFrame:
+    df = pd.DataFrame(rows, columns=columns)
+    # Ensure IDs are sorted numerically
+    try:
+        df["ID"] = pd.to_numeric(df["ID"], errors="coerce")
+    except Exception:
+        pass
+    return df.sort_values("ID")
+
+
+def employee_fields_frame(client):
+    """Stream all employees and collect every unique field. Returns (df, warnings)."""
+    warnings = []
+    all_fields = {}
+    employee_count = 0
+    try:
+        for emp in iter_employees_cached(client, include_inactive=True):
+            employee_count += 1
+            for fid, fld in emp.get("field", {}).items():
+                if fid not in all_fields:
+                    all_fields[fid] = {
+                        "name": fld.get("name", ""),
+                        "type": fld.get("type", ""),
+                    }
+        if not employee_count:
+            warnings.append(WARNING_TEMPLATE.format("Employees"))
+    except Exception:
+        warnings.append(WARNING_TEMPLATE.format("Employees"))
+        all_fields = {}
+    field_rows = [
+        {"ID": fid, "Name": info["name"], "Type": info["type"]}
+        for fid, info in all_fields.items()
+    ]
+    return _sorted_by_id(field_rows, ["ID", "Name", "Type"]), warnings
+
+
+def lists_frame(client):
+    """Fetch list definitions and collect their scales. Returns (df, warnings)."""
+    warnings = []
+    try:
+        data_lst = client.get_json("lists")
+        list_items = data_lst.get("list") if isinstance(data_lst, dict) else []
+        if not list_items:
+            warnings.append(WARNING_TEMPLATE.format("Lists"))
+            list_items = []
+    except Exception:
+        warnings.append(WARNING_TEMPLATE.format("Lists"))
+        list_items = []
+    list_scales = {}
+    for item in list_items:
+        scale = item.get("scale", {})
+        sid = scale.get("id", "")
+        sname = scale.get("name", "")
+        if sid and sid not in list_scales:
+            list_scales[sid] = sname
+    list_rows = [{"ID": sid, "Name": sname} for sid, sname in list_scales.items()]
+    return _sorted_by_id(list_rows, ["ID", "Name"]), warnings
+
+
+def organizations_frame(client):
+    """Fetch organizations and collect their fields. Returns (df, warnings)."""
+    warnings = []
+    try:
+        data_org = client.get_json("organizations")
+        org_items = data_org.get("organizations") if isinstance(data_org, dict) else []
+        if not org_items:
+            warnings.append(WARNING_TEMPLATE.format("Organizations"))
+            org_items = []
+    except Exception:
+        warnings.append(WARNING_TEMPLATE.format("Organizations"))
+        org_items = []
+    org_fields = {}
+    for item in org_items:
+        for fid, fld in item.get("field", {}).items():
+            if fid not in org_fields:
+                org_fields[fid] = fld.get("name", "")
+    org_rows = [{"ID": fid, "Name": name} for fid, name in org_fields.items()]
+    return _sorted_by_id(org_rows, ["ID", "Name"]), warnings
+
+
+def fetch_field_overview(client):
+    """Fetch Employees, Lists and Organizations concurrently.
+
+    Returns (df_fields, df_lists, df_orgs, warnings), with warnings merged in
+    that resource order once all three have finished.
+    """
+    builders = (employee_fields_frame, lists_frame, organizations_frame)
+    with ThreadPoolExecutor(max_workers=len(builders)) as pool:
+        futures = [pool.submit(build, client) for build in builders]
+        results = [future.result() for future in futures]
+    warnings = [warn for _, warns in results for warn in warns]
+    df_fields, df_lists, df_orgs = (df for df, _ in results)
+    return df_fields, df_lists, df_orgs, warnings
+
+
+def build_excel(df_fields, df_lists, df_orgs) -> BytesIO:
+    """Write the non-empty frames to an .xlsx workbook with fitted columns."""
+    excel_buffer = BytesIO()
+    with pd.ExcelWriter(excel_buffer, engine="openpyxl") as writer:
+        # Write only non-empty DataFrames and track sheet names
+        sheet_names = []
+        if not df_fields.empty:
+            df_fields.to_excel(writer, sheet_name="Employee Fields", index=False)
+            sheet_names.append("Employee Fields")
+        if not df_lists.empty:
+            df_lists.to_excel(writer, sheet_name="Lists", index=False)
+            sheet_names.append("Lists")
+        if not df_orgs.empty:
+            df_orgs.to_excel(writer, sheet_name="Organizations", index=False)
+            sheet_names.append("Organizations")
+
+        # Adjust columns and alignment only for included sheets
+        for sheet_name in sheet_names:
+            worksheet = writer.sheets[sheet_name]
+            for idx, col in enumerate(worksheet.columns, 1):
+                max_length = 0
+                column = col[0].column_letter
+                for cell in col:
+                    try:
+                        val = str(cell.value)
+                        if len(val) > max_length:
+                            max_length = len(val)
+                    except Exception:
+                        pass
+                adjusted_width = max_length + 2
+                worksheet.column_dimensions[column].width = adjusted_width
+            for row in worksheet.iter_rows():
+                for cell in row:
+                    cell.alignment = Alignment(horizontal="left")
+    excel_buffer.seek(0)
+    return excel_buffer
@@ -0,0 +1,362 @@
+# tctoolbox/core/history.py
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+import zipfile
+from itertools import compress, repeat
+
+from core.archive import add_files
+
+IDENTIFIER_PREFIXES = ("47:", "0:", "7:", "101:")
+
+
+def aggregate_fields(employees):
+    """Collect every field ID and name across ``employees``.
+
+    Returns (options, id_opts) as "<id>: <name>" labels sorted by ID, where
+    id_opts are the fields usable as identifier.
+    """
+    field_map = {}
+    for emp in employees:
+        for fid, fld in emp.get("field", {}).items():
+            field_map[fid] = fld.get("name", "")
+    options = [
+        f"{fid}: {name}"
+        for fid, name in sorted(field_map.items(), key=lambda x: int(x[0]))
+    ]
+    id_opts = [opt for opt in options if opt.startswith(IDENTIFIER_PREFIXES)]
+    return options, id_opts
+
+
+# --- Timeline flattening ---
+
+FLATTEN_BATCH_ROWS = 100_000
+COLUMNS = ("identifier", "name", "username", "value", "valid_from", "valid_to")
+
+
+def _entry_value(d):
+    if isinstance(d, dict):
+        return d.get("value") or d.get("alternativeExportValue") or ""
+    if isinstance(d, list):
+        return ";".join(x.get("value", "") for x in d)
+    return ""
+
+
+def _timeline_columns(identifiers, names, usernames, entries, exclude_current):
+    """Turn raw timeline entries plus their owners into export columns."""
+    valid_from = [
+        rec.get("dataValidFrom") or rec.get("lastModified") for rec in entries
+    ]
+    valid_to = [rec.get("dataValidTo") or "" for rec in entries]
+    data = [rec.get("data") for rec in entries]
+    if set(map(type, data)) <= {dict}:
+        # Common case: plain values only
+        values = [d.get("value") or d.get("alternativeExportValue") or "" for d in data]
+    else:
+        values = [_entry_value(d) for d in data]
+    columns = [identifiers, names, usernames, values, valid_from, valid_to]
+    if exclude_current:
+        keep = list(map(bool, valid_to))
+        columns = [list(compress(column, keep)) for column in columns]
+    return dict(zip(COLUMNS, columns))
+
+
+def flatten_timelines(
+    employees,
+    identifier: str,
+    selected_fields,
+    exclude_current=False,
+    batch_rows=FLATTEN_BATCH_ROWS,
+):
+    """Flatten the timelines of ``selected_fields`` into columnar batches.
+
+    Yields dicts mapping each selected field's position to its columns
+    (COLUMNS, equal-length lists, one row per timeline entry) for roughly
+    ``batch_rows`` rows at a time. ``employees`` is consumed in a single
+    pass; per batch, entries are gathered per field and each column is then
+    derived in bulk instead of row by row.
+    """
+    id_fid = identifier.split(": ", 1)[0]
+    fids = [item.split(": ", 1)[0] for item in selected_fields]
+
+    def empty():
+        return [([], [], [], []) for _ in fids]
+
+    def flush(buffers):
+        return {
+            n: _timeline_columns(*buffer, exclude_current)
+            for n, buffer in enumerate(buffers)
+            if buffer[3]
+        }
+
+    buffers, rows = empty(), 0
+    for emp in employees:
+        fields = emp.get("field", {})
+        id_val = fields.get(id_fid, {}).get("data", {}).get("value", "")
+        name = emp.get("name")
+        username = emp.get("username")
+        for n, fid in enumerate(fids):
+            fld = fields.get(fid)
+            if not fld:
+                continue
+            entries = fld.get("timelineChange")
+            if not entries:
+                continue
+            count = len(entries)
+            identifiers, names, usernames, gathered = buffers[n]
+            identifiers.extend(repeat(id_val, count))
+            names.extend(repeat(name, count))
+            usernames.extend(repeat(username, count))
+            gathered.extend(entries)
+            rows += count
+        if rows >= batch_rows:
+            yield flush(buffers)
+            buffers, rows = empty(), 0
+    if rows:
+        yield flush(buffers)
+
+
+# --- Backup ---
+
+BACKUP_SUFFIX = ".ndjson.gz"
+BACKUP_COMPRESSLEVEL = 6
+
+
+def tee_backup(employees, path):
+    """Yield ``employees`` unchanged while writing each one as a line of
+    gzip'd newline-delimited JSON to ``path``."""
+    with gzip.open(
+        path, "wt", encoding="utf-8", compresslevel=BACKUP_COMPRESSLEVEL
+    ) as backup:
+        for emp in employees:
+            backup.write(json.dumps(emp, ensure_ascii=False))
+            backup.write("\n")
+            yield emp
+
+
+def iter_backup(source):
+    """Read a backup (path or binary file) back one employee at a time."""
+    with gzip.open(source, "rt", encoding="utf-8") as backup:
+        for line in backup:
+            yield json.loads(line)
+
+
+# --- ZIP of CSV files ---
+
+
+# Characters that make the csv module quote a cell (";" delimiter)
+CSV_SPECIAL = ('"', ";", "\r", "\n")
+
+
+def _as_text(column):
+    if set(map(type, column)) <= {str}:
+        return column
+    return ["" if cell is None else str(cell) for cell in column]
+
+
+def _write_csv_columns(csv_file, columns):
+    """Append rows given as columns, byte-identical to csv.writer(delimiter=";")."""
+    cells = [_as_text(column) for column in columns]
+    joined = ["\0".join(column) for column in cells]
+    if any(ch in text for text in joined for ch in CSV_SPECIAL):
+        csv.writer(csv_file, delimiter=";").writerows(zip(*cells))
+    elif cells[0]:
+        # Nothing to quote: join whole rows at C speed
+        csv_file.write("\r\n".join(map(";".join, zip(*cells))))
+        csv_file.write("\r\n")
+
+
+def write_history_zip(
+    employees,
+    identifier: str,
+    selected_fields,
+    target,
+    exclude_current=False,
+    write_debug=False,
+    prefix="historical_",
+    compression=zipfile.ZIP_DEFLATED,
+    compresslevel=None,
+    workers=1,
+):
+    """Write the Historical Export ZIP to ``target`` (a path or binary file).
+
+    One semicolon CSV per selected field; ``identifier`` and
+    ``selected_fields`` are "<id>: <name>" labels. ``employees`` is consumed
+    in a single pass (any iterable, e.g. a stream) and flattened in batches
+    (see flatten_timelines), each batch appended to the per-field CSVs. Rows go straight
+    to per-field temp files on disk, which are then streamed into the
+    archive, so memory use does not grow with the size of the export.
+
+    With ``write_debug`` the complete employees are added as a gzip'd
+    NDJSON backup, streamed like the CSVs.
+
+    ``compression`` and ``compresslevel`` are passed to ZipFile; with
+    ``workers`` > 1 the CSVs are deflated in parallel (see core.archive).
+    """
+    id_fid, id_name = identifier.split(": ", 1)
+
+    with tempfile.TemporaryDirectory(prefix="tctoolbox-history-") as workdir:
+        # One CSV file and writer per selected field, all open at once
+        targets = []
+        try:
+            for n, item in enumerate(selected_fields):
+                fid, fname = item.split(": ", 1)
+                safe = "".join(c if c.isalnum() else "_" for c in fname).strip("_")
+                csv_file = open(
+                    os.path.join(workdir, f"{n}.csv"), "w", encoding="utf-8", newline=""
+                )
+                # Write CSV header row
+                csv.writer(csv_file, delimiter=";").writerow(
+                    [id_name, "Name", "Username", fname, "Valid From", "Valid To"]
+                )
+                targets.append((fid, f"{prefix}{safe}.csv", csv_file))
+
+            # The backup is written alongside, one employee at a time
+            backup_path = os.path.join(workdir, "backup.ndjson.gz")
+            if write_debug:
+                employees = tee_backup(employees, backup_path)
+            # Write data rows for each selected field, a batch at a time
+            for batch in flatten_timelines(
+                employees, identifier, selected_fields, exclude_current
+            ):
+                for n, columns in batch.items():
+                    _write_csv_columns(targets[n][2], columns.values())
+        finally:
+            for _, _, csv_file in targets:
+                csv_file.close()
+
+        with zipfile.ZipFile(
+            target, "w", compression, compresslevel=compresslevel
+        ) as zip_file:
+            # Add CSVs to ZIP archive in selection order
+            add_files(
+                zip_file,
+                [(csv_file.name, arcname) for _, arcname, csv_file in targets],
+                workers,
+            )
+
+            # Optionally add the complete backup (already gzip'd) to ZIP
+            if write_debug:
+                zip_file.write(
+                    backup_path,
+                    f"{prefix}backup{BACKUP_SUFFIX}",
+                    compress_type=zipfile.ZIP_STORED,
+                )
+
+
+def build_history_zip(
+    employees, identifier: str, selected_fields, *args, **kwargs
+) -> bytes:
+    """Like write_history_zip, but returns the archive as bytes."""
+    buffer = io.BytesIO()
+    write_history_zip(employees, identifier, selected_fields, buffer, *args, **kwargs)
+    return buffer.getvalue()
+
+
+# --- Columnar output ---
+
+PARQUET_BATCH_ROWS = 100_000
+
+
+def _parquet_schema(id_name):
+    import pyarrow as pa
+
+    return pa.schema(
+        [
+            ("identifier", pa.string()),
+            ("name", pa.string()),
+            ("username", pa.string()),
+            ("field_id", pa.int64()),
+            ("field_name", pa.string()),
+            ("value", pa.string()),
+            ("valid_from", pa.timestamp("s")),
+            ("valid_to", pa.timestamp("s")),
+        ],
+        metadata={"identifier": id_name},
+    )
+
+
+def _strings(values):
+    """String column for Arrow: the API can send numbers (e.g. a numeric
+    identifier), which pa.string() rejects; missing values stay null."""
+    import pyarrow as pa
+
+    if not set(map(type, values)) <= {str, type(None)}:
+        values = [None if v is None else str(v) for v in values]
+    return pa.array(values, type=pa.string())
+
+
+def _timestamps(values):
+    """Parse ISO dates/datetimes to naive UTC timestamps; blanks become null."""
+    import pandas as pd
+
+    parsed = pd.to_datetime(
+        pd.Series(values, dtype="string"), format="ISO8601", utc=True, errors="coerce"
+    )
+    return parsed.dt.tz_localize(None).astype("datetime64[s]")
+
+
+def write_history_parquet(
+    employees,
+    identifier: str,
+    selected_fields,
+    target,
+    exclude_current=False,
+    batch_rows=PARQUET_BATCH_ROWS,
+):
+    """Write the timeline history of ``selected_fields`` as one Parquet file.
+
+    One row per employee, field and timeline entry, with dates as
+    timestamps (null "valid_to" for the current value). Rows are written in
+    row groups of ``batch_rows`` so memory stays bounded; ``employees`` is
+    consumed in a single pass. Requires pyarrow.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError(
+            "Parquet output requires pyarrow (pip install pyarrow)."
+        ) from e
+
+    id_name = identifier.split(": ", 1)[1]
+    field_ids, field_names = [], []
+    for item in selected_fields:
+        fid, fname = item.split(": ", 1)
+        field_ids.append(int(fid))
+        field_names.append(fname)
+
+    schema = _parquet_schema(id_name)
+    with pq.ParquetWriter(target, schema, compression="zstd") as writer:
+        for batch in flatten_timelines(
+            employees, identifier, selected_fields, exclude_current, batch_rows
+        ):
+            # Field by field within the row group
+            merged = {name: [] for name in COLUMNS}
+            ids, names = [], []
+            for n, columns in batch.items():
+                for name in COLUMNS:
+                    merged[name].extend(columns[name])
+                count = len(columns["value"])
+                ids.extend(repeat(field_ids[n], count))
+                names.extend(repeat(field_names[n], count))
+            if not ids:
+                continue
+            arrays = [
+                _strings(merged["identifier"]),
+                _strings(merged["name"]),
+                _strings(merged["username"]),
+                pa.array(ids, type=pa.int64()),
+                _strings(names),
+                _strings(merged["value"]),
+            ]
+            for name in ("valid_from", "valid_to"):
+                arrays.append(
+                    pa.Array.from_pandas(
+                        _timestamps(merged[name]), type=pa.timestamp("s")
+                    )
+                )
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
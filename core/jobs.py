@@ -0,0 +1,317 @@
+# tctoolbox/core/jobs.py
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+
+from core.retry import TokenBucket
+
+# Heavy jobs allowed to run at once in this process; the rest wait in line
+DEFAULT_MAX_WORKERS = int(os.environ.get("TCTOOLBOX_JOB_WORKERS", "2"))
+# Memory budget shared by running jobs, and the claim of a job without
+# parallel work (pages add what their workers need, see job_memory)
+DEFAULT_MEMORY_BUDGET = int(os.environ.get("TCTOOLBOX_JOB_MEMORY_MB", "1024")) * 1024**2
+DEFAULT_JOB_MEMORY = 256 * 1024**2
+# Default download bandwidth of one job in bytes/s (0 = unlimited)
+DEFAULT_JOB_BANDWIDTH = int(
+    float(os.environ.get("TCTOOLBOX_JOB_BANDWIDTH_MB", "25")) * 1024**2
+)
+# Finished jobs (and their results) are kept this long for the pages to pick up
+DEFAULT_RETENTION = 24 * 60 * 60
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+def job_memory(extra: int = 0) -> int:
+    """Memory claim of a job whose parallel work needs ``extra`` bytes on top
+    of the base claim (e.g. core.archive.compression_memory)."""
+    return DEFAULT_JOB_MEMORY + extra
+
+
+class JobCancelled(Exception):
+    """Raised inside a job that was cancelled from the UI."""
+
+
+class Job:
+    """One unit of background work and its progress counters.
+
+    The work function receives the job and reports progress with
+    ``set_total`` and ``advance``; pages read ``progress()``. Cancellation is
+    cooperative: ``advance`` and ``track`` raise JobCancelled once requested.
+    """
+
+    def __init__(
+        self,
+        kind: str,
+        label: str = "",
+        owner=None,
+        memory=DEFAULT_JOB_MEMORY,
+        bandwidth=DEFAULT_JOB_BANDWIDTH,
+    ):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.label = label
+        self.owner = owner
+        # Memory the job may use (for admission) and its download budget;
+        # work functions hand ``bandwidth`` to their ApiClient
+        self.memory = memory
+        self.bandwidth = TokenBucket(bandwidth) if bandwidth else None
+        self.status = QUEUED
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.items_done = 0
+        self.items_total = None
+        self.bytes_done = 0
+        self.result = None
+        self.error = None
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+
+    # --- Reporting (called from the work function) ---
+
+    def set_total(self, items):
+        self.items_total = items
+
+    def advance(self, items=1, nbytes=0):
+        if self._cancel.is_set():
+            raise JobCancelled()
+        with self._lock:
+            self.items_done += items
+            self.bytes_done += nbytes
+
+    def track(self, iterable):
+        """Yield from ``iterable``, counting one item per element."""
+        for item in iterable:
+            self.advance()
+            yield item
+
+    # --- Control ---
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    @property
+    def done(self) -> bool:
+        return self.status in FINISHED
+
+    def progress(self) -> dict:
+        """Counters plus rate (items/s, bytes/s) and ETA in seconds, if known."""
+        with self._lock:
+            items, nbytes = self.items_done, self.bytes_done
+        end = self.finished or time.time()
+        elapsed = end - self.started if self.started else 0.0
+        rate = items / elapsed if elapsed > 0 else 0.0
+        eta = None
+        if self.items_total and rate > 0 and not self.done:
+            eta = max(self.items_total - items, 0) / rate
+        return {
+            "status": self.status,
+            "items_done": items,
+            "items_total": self.items_total,
+            "bytes_done": nbytes,
+            "elapsed": elapsed,
+            "rate": rate,
+            "byte_rate": nbytes / elapsed if elapsed > 0 else 0.0,
+            "eta": eta,
+        }
+
+
+class JobRunner:
+    """Process-wide scheduler running jobs in background threads.
+
+    Jobs wait in one queue per owner (a browser session); the next job to
+    start comes from the owner with the fewest running jobs, round-robin on
+    ties, so one user's batch of jobs cannot hold back everybody else. At most ``max_workers`` jobs run at once, and a job only
+    starts when its memory claim fits in ``memory_budget`` next to the
+    running ones (a job larger than the budget runs alone). Jobs outlive
+    Streamlit reruns and browser sessions; pages keep only the job ID.
+    """
+
+    def __init__(
+        self,
+        max_workers=DEFAULT_MAX_WORKERS,
+        memory_budget=DEFAULT_MEMORY_BUDGET,
+        retention=DEFAULT_RETENTION,
+    ):
+        self.max_workers = max_workers
+        self.memory_budget = memory_budget
+        self.retention = retention
+        self._jobs = {}
+        # owner -> queued jobs; the order of the keys is the round-robin turn
+        self._queues = OrderedDict()
+        self._running = set()
+        self._lock = threading.Lock()
+
+    def submit(
+        self,
+        kind: str,
+        fn,
+        *args,
+        label="",
+        owner=None,
+        memory=DEFAULT_JOB_MEMORY,
+        bandwidth=DEFAULT_JOB_BANDWIDTH,
+        **kwargs,
+    ) -> Job:
+        """Queue ``fn(job, *args, **kwargs)``; its return value becomes
+        ``job.result``."""
+        self._purge()
+        job = Job(kind, label, owner, memory, bandwidth)
+        job._work = (fn, args, kwargs)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._queues.setdefault(owner, deque()).append(job)
+            self._dispatch()
+        return job
+
+    def cancel(self, job):
+        """Cancel a job: drop it from its queue, or ask a running one to stop."""
+        job.cancel()
+        with self._lock:
+            queue = self._queues.get(job.owner)
+            if job.status == QUEUED and queue and job in queue:
+                queue.remove(job)
+                if not queue:
+                    del self._queues[job.owner]
+                job.status, job.finished = CANCELLED, time.time()
+
+    # --- Scheduling ---
+
+    def _fits(self, job) -> bool:
+        used = sum(j.memory for j in self._running)
+        return not self._running or used + job.memory <= self.memory_budget
+
+    def _start_order(self) -> list:
+        """Queued jobs in the order they would start (lock held).
+
+        The next job comes from the owner with the fewest running jobs; ties
+        go to the owner whose turn it is (the key order of ``_queues``).
+        """
+        running = {}
+        for job in self._running:
+            running[job.owner] = running.get(job.owner, 0) + 1
+        turns = [(owner, deque(queue)) for owner, queue in self._queues.items()]
+        order = []
+        while turns:
+            index = min(range(len(turns)), key=lambda i: running.get(turns[i][0], 0))
+            owner, queue = turns.pop(index)
+            order.append(queue.popleft())
+            running[owner] = running.get(owner, 0) + 1
+            if queue:
+                turns.append((owner, queue))
+        return order
+
+    def _dispatch(self):
+        # Called with the lock held
+        while self._queues and len(self._running) < self.max_workers:
+            job = self._start_order()[0]
+            if not self._fits(job):
+                # Wait for memory rather than letting smaller jobs overtake
+                break
+            queue = self._queues.pop(job.owner)
+            queue.popleft()
+            # The owner goes to the back of the line
+            if queue:
+                self._queues[job.owner] = queue
+            self._running.add(job)
+            job.status = RUNNING
+            threading.Thread(
+                target=self._run, args=(job,), name=f"tctoolbox-job-{job.id}"
+            ).start()
+
+    def _run(self, job):
+        fn, args, kwargs = job._work
+        job.started = time.time()
+        try:
+            job.result = fn(job, *args, **kwargs)
+            job.status = DONE
+        except JobCancelled:
+            job.status = CANCELLED
+        except Exception as e:
+            job.error = e
+            job.status = FAILED
+        finally:
+            job.finished = time.time()
+            job._work = None
+            with self._lock:
+                self._running.discard(job)
+                self._dispatch()
+
+    # --- Lookup ---
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self, owner=None) -> list:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [j for j in jobs if owner is None or j.owner == owner]
+
+    def position(self, job):
+        """1-based place of a queued job in the start order, or None."""
+        with self._lock:
+            order = self._start_order()
+        return order.index(job) + 1 if job in order else None
+
+    def load(self) -> dict:
+        with self._lock:
+            return {
+                "running": len(self._running),
+                "queued": sum(len(q) for q in self._queues.values()),
+                "max_workers": self.max_workers,
+            }
+
+    def _purge(self):
+        cutoff = time.time() - self.retention
+        with self._lock:
+            for job_id, job in list(self._jobs.items()):
+                if job.done and job.finished < cutoff:
+                    del self._jobs[job_id]
+
+
+def _duration(seconds) -> str:
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m {seconds % 60:02d}s"
+    return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+
+
+def describe_progress(progress: dict, unit="items") -> str:
+    """One-line summary such as "120 of 800 documents · 3.1 MB · 12.0/s · ETA 56s"."""
+    done, total = progress["items_done"], progress["items_total"]
+    parts = [f"{done:,} of {total:,} {unit}" if total else f"{done:,} {unit}"]
+    if progress["bytes_done"]:
+        parts.append(f"{progress['bytes_done'] / 1024**2:,.1f} MB")
+    parts.append(f"{progress['rate']:,.1f}/s")
+    if progress["eta"] is not None:
+        parts.append(f"ETA {_duration(progress['eta'])}")
+    else:
+        parts.append(f"{_duration(progress['elapsed'])} elapsed")
+    return " · ".join(parts)
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def default_runner() -> JobRunner:
+    """The job runner shared by every session of this process."""
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = JobRunner()
+        return _runner
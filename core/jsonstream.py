@@ -0,0 +1,117 @@
+# tctoolbox/core/jsonstream.py
+import codecs
+import json
+import re
+
+_WS = re.compile(r"[ \t\r\n]*")
+# Characters that can follow a complete number
+_NUMBER_END = frozenset(",]} \t\r\n")
+_decoder = json.JSONDecoder()
+
+
+class _Reader:
+    """Text buffer over an iterable of byte chunks, decoded incrementally."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """Append the next chunk, dropping consumed text. False once exhausted."""
+        if self.eof:
+            return False
+        for chunk in self._chunks:
+            text = self._utf8.decode(chunk) if isinstance(chunk, bytes) else chunk
+            if text:
+                self.buf = self.buf[self.pos :] + text
+                self.pos = 0
+                return True
+        self.eof = True
+        self.buf = self.buf[self.pos :] + self._utf8.decode(b"", final=True)
+        self.pos = 0
+        return False
+
+    def peek(self) -> str:
+        """Skip whitespace and return the next character ('' at end of input)."""
+        while True:
+            self.pos = _WS.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill() and self.pos >= len(self.buf):
+                return ""
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise json.JSONDecodeError(f"Expecting '{char}'", self.buf, self.pos)
+        self.pos += 1
+
+    def _complete(self, obj, end: int) -> bool:
+        if end >= len(self.buf):
+            return False
+        if isinstance(obj, (int, float)) and not isinstance(obj, bool):
+            return self.buf[end] in _NUMBER_END
+        return True
+
+    def value(self):
+        """Decode one complete JSON value starting at the current position."""
+        self.peek()
+        need = 0
+        while True:
+            available = len(self.buf) - self.pos
+            if available >= need or self.eof:
+                try:
+                    obj, end = _decoder.raw_decode(self.buf, self.pos)
+                except json.JSONDecodeError:
+                    if self.eof:
+                        raise
+                else:
+                    # A value touching the end of the buffer may be truncated,
+                    # and a number cut after "1", "1." or "1e" still decodes
+                    # as a shorter one: only accept it with a delimiter behind.
+                    if self.eof or self._complete(obj, end):
+                        self.pos = end
+                        return obj
+                # Wait until the buffer has doubled before re-parsing, which
+                # keeps large values linear instead of quadratic.
+                need = 2 * available
+            self.fill()
+
+
+def iter_array(chunks, key: str):
+    """Yield the items of the array stored under ``key`` in a top-level object.
+
+    ``chunks`` is any iterable of bytes (e.g. ``Response.iter_content()``).
+    Only one item is held in memory at a time; other top-level members are
+    parsed and discarded. Yields nothing if the document is not an object.
+    """
+    reader = _Reader(chunks)
+    if reader.peek() != "{":
+        return
+    reader.pos += 1
+    while True:
+        char = reader.peek()
+        if char in ("}", ""):
+            return
+        if char == ",":
+            reader.pos += 1
+            continue
+        name = reader.value()
+        reader.expect(":")
+        if name != key or reader.peek() != "[":
+            reader.value()
+            continue
+        reader.pos += 1
+        while True:
+            char = reader.peek()
+            if char == "]":
+                reader.pos += 1
+                break
+            if char == ",":
+                reader.pos += 1
+                continue
+            if char == "":
+                raise json.JSONDecodeError("Unterminated array", reader.buf, reader.pos)
+            yield reader.value()
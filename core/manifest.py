@@ -0,0 +1,114 @@
+# tctoolbox/core/manifest.py
+import hashlib
+import os
+import sqlite3
+import time
+
+# Kept in the download folder itself, so a re-run into it can resume
+MANIFEST_NAME = ".tctoolbox-manifest.sqlite"
+DONE = "done"
+FAILED = "failed"
+READ_SIZE = 1024 * 1024
+
+
+def _checksum(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(READ_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DownloadManifest:
+    """SQLite record of every document a download into ``folder`` attempted.
+
+    One row per target path (relative to the folder) with its link, size,
+    status, SHA-256 checksum and last error. A re-run checks ``is_complete``
+    to skip documents that are already on disk. Use from one thread only.
+    """
+
+    def __init__(self, folder: str):
+        self.folder = folder
+        self.path = os.path.join(folder, MANIFEST_NAME)
+        self._db = sqlite3.connect(self.path)
+        # Every record is committed; in WAL mode without a sync per commit
+        # that is cheap, and a killed run keeps everything it finished
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS documents (
+                path TEXT PRIMARY KEY,
+                link TEXT NOT NULL,
+                size INTEGER,
+                status TEXT NOT NULL,
+                checksum TEXT,
+                error TEXT,
+                updated REAL NOT NULL
+            )
+            """
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS documents_link ON documents (link)"
+        )
+        self._db.commit()
+
+    def _relative(self, path: str) -> str:
+        return os.path.relpath(path, self.folder)
+
+    def status(self, path: str, link: str):
+        """Recorded status of ``path`` for ``link``, or None if never tried
+        (or last tried for a different link)."""
+        row = self._db.execute(
+            "SELECT status FROM documents WHERE path = ? AND link = ?",
+            (self._relative(path), link),
+        ).fetchone()
+        return row[0] if row else None
+
+    def is_complete(self, path: str, link: str) -> bool:
+        """Whether ``link`` was downloaded to ``path`` and the file is still
+        there with the recorded size and checksum."""
+        row = self._db.execute(
+            "SELECT size, checksum FROM documents "
+            "WHERE path = ? AND link = ? AND status = ?",
+            (self._relative(path), link, DONE),
+        ).fetchone()
+        if row is None:
+            return False
+        size, checksum = row
+        try:
+            if os.path.getsize(path) != size:
+                return False
+            # Reading the file back is far cheaper than downloading it again
+            return checksum is None or _checksum(path) == checksum
+        except OSError:
+            return False
+
+    def checksum_for(self, link: str):
+        """Checksum of the content last downloaded from ``link`` to any path,
+        or None."""
+        row = self._db.execute(
+            "SELECT checksum FROM documents WHERE link = ? AND status = ? "
+            "AND checksum IS NOT NULL ORDER BY updated DESC LIMIT 1",
+            (link, DONE),
+        ).fetchone()
+        return row[0] if row else None
+
+    def record(self, path: str, link: str, size=None, checksum=None, error=None):
+        """Store the outcome of one download (failed if ``error`` is given)."""
+        self._db.execute(
+            "INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                self._relative(path),
+                link,
+                size,
+                FAILED if error else DONE,
+                checksum,
+                error,
+                time.time(),
+            ),
+        )
+        self._db.commit()
+
+    def close(self):
+        self._db.close()
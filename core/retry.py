@@ -0,0 +1,153 @@
+# tctoolbox/core/retry.py
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+# Responses worth retrying: rate limiting and transient gateway/server errors
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+# Responses that signal the tenant wants us to slow down
+THROTTLE_STATUSES = frozenset({429, 503})
+
+
+def parse_retry_after(resp):
+    """Return the Retry-After delay of ``resp`` in seconds, or None."""
+    value = resp.headers.get("Retry-After") if resp is not None else None
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter that honors Retry-After."""
+
+    def __init__(
+        self,
+        max_retries=5,
+        backoff_base=0.5,
+        backoff_max=60.0,
+        statuses=RETRY_STATUSES,
+    ):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.statuses = statuses
+
+    def delay(self, attempt: int, resp=None) -> float:
+        retry_after = parse_retry_after(resp)
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+
+
+class AdaptiveLimiter:
+    """Concurrency limit adjusted by AIMD from 429s and latency.
+
+    The limit grows by about one slot per ``limit`` successful calls and is
+    multiplied by ``decrease`` on throttling, or when a call takes more than
+    ``latency_tolerance`` times the running average latency. At most one
+    decrease happens per cool-down period so a burst of 429s counts once.
+    """
+
+    def __init__(
+        self,
+        initial=4,
+        minimum=1,
+        maximum=32,
+        decrease=0.5,
+        latency_tolerance=3.0,
+        cooldown=1.0,
+    ):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+        self.cooldown = cooldown
+        self.limit = float(initial)
+        self.in_flight = 0
+        self.avg_latency = None
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while self.in_flight >= max(self.minimum, int(self.limit)):
+                self._cond.wait()
+            self.in_flight += 1
+
+    def release(self, throttled=False, latency=None):
+        with self._cond:
+            self.in_flight -= 1
+            slow = (
+                latency is not None
+                and self.avg_latency is not None
+                and latency > self.latency_tolerance * self.avg_latency
+            )
+            if latency is not None and not throttled:
+                self.avg_latency = (
+                    latency
+                    if self.avg_latency is None
+                    else 0.9 * self.avg_latency + 0.1 * latency
+                )
+            now = time.monotonic()
+            if throttled or slow:
+                if now - self._last_decrease >= self.cooldown:
+                    self.limit = max(self.minimum, self.limit * self.decrease)
+                    self._last_decrease = now
+            else:
+                self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            self._cond.notify_all()
+
+
+class TokenBucket:
+    """Limit a byte stream to ``rate`` bytes per second on average.
+
+    Up to ``burst`` bytes (default one second's worth) pass without waiting;
+    larger reads run into debt and ``consume`` sleeps it off, so the long-run
+    rate holds even when chunks are bigger than the bucket.
+    """
+
+    def __init__(self, rate: float, burst: float = None):
+        self.rate = float(rate)
+        self.capacity = float(burst or rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, nbytes: int):
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            self.tokens -= nbytes
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+
+    def throttle(self, chunks):
+        """Yield ``chunks`` (bytes) no faster than the bucket allows."""
+        for chunk in chunks:
+            self.consume(len(chunk))
+            yield chunk
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def limiter_for(key: str) -> AdaptiveLimiter:
+    """Return the process-wide limiter for ``key`` (one per tenant)."""
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = _limiters[key] = AdaptiveLimiter()
+        return limiter
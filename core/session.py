@@ -0,0 +1,119 @@
+# tctoolbox/core/session.py
+import hmac
+import uuid
+
+import streamlit as st
+
+from core.jobs import (
+    CANCELLED,
+    DONE,
+    FAILED,
+    QUEUED,
+    default_runner,
+    describe_progress,
+)
+from core.tokens import TokenManager
+
+POLL_INTERVAL = 1.0
+# URL parameter holding the session owner, so a refreshed page can reclaim its jobs
+OWNER_PARAM = "session"
+
+
+def session_tokens() -> TokenManager:
+    """Return the token manager shared by all pages of this browser session."""
+    if "token_manager" not in st.session_state:
+        st.session_state.token_manager = TokenManager()
+    return st.session_state.token_manager
+
+
+# --- Background jobs ---
+
+
+def session_owner() -> str:
+    """Unguessable ID of this browser session; jobs are queued fairly per
+    owner and only shown to it. A refreshed page takes it back from the URL."""
+    if "job_owner" not in st.session_state:
+        st.session_state.job_owner = (
+            st.query_params.get(OWNER_PARAM) or uuid.uuid4().hex
+        )
+    return st.session_state.job_owner
+
+
+def remember_job(key: str, job) -> None:
+    """Keep a job ID in the session and the URL, so it survives a browser refresh.
+
+    The URL also gets the owner, without which the job cannot be shown.
+    """
+    st.session_state[key] = job.id
+    st.query_params[key] = job.id
+    st.query_params[OWNER_PARAM] = job.owner
+
+
+def remembered_job(key: str):
+    """Return the job last stored under ``key``, or None (also if the job
+    belongs to another session, e.g. a guessed job ID). The page URL carries
+    both the job ID and its owner, so sharing it shares the job."""
+    job_id = st.session_state.get(key) or st.query_params.get(key)
+    job = default_runner().get(job_id) if job_id else None
+    if job is None or not hmac.compare_digest(str(job.owner), session_owner()):
+        return None
+    return job
+
+
+def job_active(key: str) -> bool:
+    """Whether the job under ``key`` is still queued or running; pages start
+    no second one meanwhile, which would orphan the first."""
+    job = remembered_job(key)
+    return job is not None and not job.done
+
+
+def show_job(key: str, render_result, unit="items") -> None:
+    """Show progress of the job under ``key`` until it finishes, then its outcome.
+
+    While the job waits or runs, a fragment polls it every POLL_INTERVAL seconds
+    without rerunning the rest of the page; ``render_result(result)`` draws
+    the result of a successful job.
+    """
+    job = remembered_job(key)
+    if job is None:
+        return
+
+    if not job.done:
+
+        @st.fragment(run_every=POLL_INTERVAL)
+        def poll():
+            if job.done:
+                # Redraw the whole page with the outcome
+                st.rerun()
+            runner = default_runner()
+            if job.status == QUEUED:
+                load = runner.load()
+                st.info(
+                    f"{job.label} is queued: position {runner.position(job)} of "
+                    f"{load['queued']} waiting, {load['running']} of "
+                    f"{load['max_workers']} job slots busy."
+                )
+                if st.button("Cancel", key=f"{key}_cancel"):
+                    runner.cancel(job)
+                return
+            progress = job.progress()
+            text = f"{job.label}: {describe_progress(progress, unit)}"
+            if progress["items_total"]:
+                ratio = min(progress["items_done"] / progress["items_total"], 1.0)
+                st.progress(ratio, text=text)
+            else:
+                st.info(text)
+            if job.cancelled:
+                st.caption("Cancelling…")
+            elif st.button("Cancel", key=f"{key}_cancel"):
+                runner.cancel(job)
+
+        poll()
+        return
+
+    if job.status == DONE:
+        render_result(job.result)
+    elif job.status == FAILED:
+        st.error(f"{job.label} failed: {job.error}")
+    elif job.status == CANCELLED:
+        st.warning(f"{job.label} was cancelled.")
@@ -0,0 +1,188 @@
+# tctoolbox/core/snapshots.py
+import gzip
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+
+from core.api import prune_fields
+from core.tokens import _fingerprint
+
+# --- Cache defaults ---
+
+DEFAULT_CACHE_DIR = os.environ.get("TCTOOLBOX_CACHE_DIR") or os.path.join(
+    os.path.expanduser("~"), ".cache", "tctoolbox", "snapshots"
+)
+DEFAULT_TTL = 60 * 60
+DEFAULT_MAX_BYTES = 2 * 1024**3
+COMPRESS_LEVEL = 4
+SUFFIX = ".ndjson.gz"
+
+
+def _slug(base_url: str) -> str:
+    return re.sub(r"[^A-Za-z0-9]+", "_", base_url).strip("_")
+
+
+class SnapshotCache:
+    """Compressed on-disk snapshots of /employees with a TTL and LRU size limit.
+
+    Each snapshot is a gzip'd newline-delimited JSON file holding complete
+    employees, keyed by tenant, client ID and secret (as a fingerprint, like
+    core.tokens), include-inactive flag and timelineSince, so Load, Count and
+    Download can share one fetch.
+    """
+
+    def __init__(
+        self, directory=DEFAULT_CACHE_DIR, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES
+    ):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def path_for(self, client, include_inactive=False, since_date=None) -> str:
+        raw = json.dumps(
+            [
+                client.base_url,
+                client.client_id,
+                _fingerprint(client.client_secret),
+                bool(include_inactive),
+                since_date or "",
+            ]
+        )
+        digest = hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+        return os.path.join(
+            self.directory, f"{_slug(client.base_url)}-{digest}{SUFFIX}"
+        )
+
+    # --- Reading ---
+
+    def is_fresh(self, path: str) -> bool:
+        try:
+            age = time.time() - os.path.getmtime(path)
+        except OSError:
+            return False
+        if age > self.ttl:
+            self._remove(path)
+            return False
+        return True
+
+    def read(self, path: str, fields=None):
+        """Yield employees from the snapshot at ``path`` (pruned to ``fields``)."""
+        # The modification time records when the snapshot was written (TTL);
+        # the access time is set explicitly for LRU eviction
+        os.utime(path, (time.time(), os.path.getmtime(path)))
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                emp = json.loads(line)
+                if fields is not None:
+                    prune_fields(emp, fields)
+                yield emp
+
+    # --- Writing ---
+
+    def write_through(self, path: str, employees, fields=None):
+        """Yield ``employees`` while recording them; the snapshot is only
+        committed once the source is fully consumed."""
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        complete = False
+        try:
+            with gzip.open(
+                os.fdopen(fd, "wb"),
+                "wt",
+                encoding="utf-8",
+                compresslevel=COMPRESS_LEVEL,
+            ) as f:
+                for emp in employees:
+                    f.write(json.dumps(emp, ensure_ascii=False, separators=(",", ":")))
+                    f.write("\n")
+                    if fields is not None:
+                        prune_fields(emp, fields)
+                    yield emp
+            os.replace(tmp, path)
+            complete = True
+        finally:
+            if not complete:
+                self._remove(tmp)
+        self.evict()
+
+    # --- Maintenance ---
+
+    def _remove(self, path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _entries(self):
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+        entries = []
+        for name in names:
+            if name.endswith(SUFFIX):
+                path = os.path.join(self.directory, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_atime, st.st_mtime, st.st_size, path))
+        return entries
+
+    def evict(self):
+        """Drop expired snapshots, then least recently used ones above max_bytes."""
+        with self._lock:
+            now = time.time()
+            live = []
+            for atime, mtime, size, path in self._entries():
+                if now - mtime > self.ttl:
+                    self._remove(path)
+                else:
+                    live.append((atime, size, path))
+            total = sum(size for _, size, _ in live)
+            for atime, size, path in sorted(live):
+                if total <= self.max_bytes:
+                    break
+                self._remove(path)
+                total -= size
+
+    def invalidate(self, base_url: str = None):
+        """Remove every snapshot for ``base_url`` (or all snapshots)."""
+        prefix = f"{_slug(base_url)}-" if base_url else ""
+        for _, _, _, path in self._entries():
+            if os.path.basename(path).startswith(prefix):
+                self._remove(path)
+
+
+_default_cache = None
+
+
+def default_cache() -> SnapshotCache:
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = SnapshotCache()
+    return _default_cache
+
+
+def iter_employees_cached(
+    client, include_inactive=False, since_date=None, fields=None, cache=None
+):
+    """Like ``ApiClient.iter_employees`` but served from the snapshot cache.
+
+    On a miss the complete payload is streamed from the API and written to
+    the cache as it is consumed; ``fields`` pruning applies to what is
+    yielded, never to what is stored. A hit is only served once the
+    credentials still get a token, as the API would require.
+    """
+    cache = cache or default_cache()
+    path = cache.path_for(client, include_inactive, since_date)
+    if cache.is_fresh(path):
+        client.token  # raises if the credentials are rejected
+        return cache.read(path, fields)
+    employees = client.iter_employees(include_inactive, since_date)
+    return cache.write_through(path, employees, fields)
@@ -0,0 +1,69 @@
+# tctoolbox/core/tokens.py
+import hashlib
+import threading
+import time
+
+# Used when /accesstoken does not report a lifetime
+DEFAULT_LIFETIME = 3600
+# Refresh this many seconds before the reported expiry (at most half the
+# lifetime, so a short-lived token is still reused)
+REFRESH_MARGIN = 60
+
+
+def _fingerprint(secret: str) -> str:
+    return hashlib.sha256(secret.encode("utf-8")).hexdigest()
+
+
+class TokenManager:
+    """Cache access tokens per domain and client ID until shortly before expiry.
+
+    One manager is kept per Streamlit session and handed to every ApiClient,
+    so all pages share the same token instead of requesting a new one on each
+    button click.
+    """
+
+    def __init__(
+        self, refresh_margin=REFRESH_MARGIN, default_lifetime=DEFAULT_LIFETIME
+    ):
+        self.refresh_margin = refresh_margin
+        self.default_lifetime = default_lifetime
+        self._tokens = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key_for(client) -> tuple:
+        return (client.base_url, client.client_id)
+
+    def get(self, client) -> str:
+        """Return a valid token for ``client``, requesting a new one if needed."""
+        key = self.key_for(client)
+        fingerprint = _fingerprint(client.client_secret)
+        with self._lock:
+            entry = self._tokens.get(key)
+            if (
+                entry
+                and entry["secret"] == fingerprint
+                and time.monotonic() < entry["refresh_at"]
+            ):
+                return entry["token"]
+            data = client.request_token()
+            lifetime = data.get("expires_in") or self.default_lifetime
+            try:
+                lifetime = float(lifetime)
+            except (TypeError, ValueError):
+                lifetime = self.default_lifetime
+            margin = min(self.refresh_margin, lifetime / 2)
+            self._tokens[key] = {
+                "token": data["access_token"],
+                "refresh_at": time.monotonic() + lifetime - margin,
+                "secret": fingerprint,
+            }
+            return data["access_token"]
+
+    def invalidate(self, client, token: str = None):
+        """Drop the cached token for ``client`` (only if it is still ``token``)."""
+        key = self.key_for(client)
+        with self._lock:
+            entry = self._tokens.get(key)
+            if entry and (token is None or entry["token"] == token):
+                del self._tokens[key]
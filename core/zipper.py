@@ -0,0 +1,57 @@
+# tctoolbox/core/zipper.py
+import os
+import zipfile
+
+PHOTO_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".gif")
+
+
+def zip_person_files(person_folder: str, zip_output_path: str) -> int:
+    """Compress all files in a person_folder into a single ZIP. Returns number of files compressed."""
+    file_count = 0
+    with zipfile.ZipFile(zip_output_path, "w", zipfile.ZIP_DEFLATED) as zipf:
+        for filename in os.listdir(person_folder):
+            file_path = os.path.join(person_folder, filename)
+            if os.path.isfile(file_path):
+                try:
+                    zipf.write(file_path, filename)
+                    file_count += 1
+                except Exception:
+                    pass
+    return file_count
+
+
+def zip_document_folders(root_folder: str, output_folder: str):
+    """ZIP each numeric subfolder of root_folder into <output_folder>/<name>.zip.
+
+    Returns (total_items, total_converted, total_failed).
+    """
+    total_items = total_converted = total_failed = 0
+    for dir_name in os.listdir(root_folder):
+        subfolder = os.path.join(root_folder, dir_name)
+        if os.path.isdir(subfolder) and dir_name.isdigit():
+            total_items += 1
+            zip_path = os.path.join(output_folder, f"{dir_name}.zip")
+            num = zip_person_files(subfolder, zip_path)
+            if num > 0:
+                total_converted += 1
+            else:
+                total_failed += 1
+    return total_items, total_converted, total_failed
+
+
+def zip_photos(root_folder: str, output_folder: str):
+    """ZIP each image file in root_folder individually, named after the image.
+
+    Returns (total_items, total_converted, total_failed).
+    """
+    total_items = total_converted = 0
+    for filename in os.listdir(root_folder):
+        if filename.lower().endswith(PHOTO_EXTENSIONS):
+            total_items += 1
+            src = os.path.join(root_folder, filename)
+            zip_name = os.path.splitext(filename)[0] + ".zip"
+            zip_path = os.path.join(output_folder, zip_name)
+            with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zipf:
+                zipf.write(src, filename)
+                total_converted += 1
+    return total_items, total_converted, 0
@@ -1,37 +1,121 @@
 # tctoolbox/pages/document_export.py
 import streamlit as st
 import os
-import requests
 import json
 from datetime import datetime
+from functools import partial
 
+import requests
 
-# --- Inline helper functions for API access ---
-def get_token(base_url: str, client_id: str, client_secret: str) -> str:
-    headers = {
-        "Client-Id": client_id.strip(),
-        "Client-Secret": client_secret.strip(),
-        "Grant-Type": "client_credentials",
-        "Api-Version": "v3",
-    }
-    resp = requests.get(f"{base_url}/accesstoken", headers=headers)
-    resp.raise_for_status()
-    return resp.json().get("access_token", "")
+from core.api import ApiClient, base_url_for
+from core.documents import (
+    DEFAULT_DOWNLOAD_WORKERS,
+    count_documents,
+    describe_throughput,
+    document_field_options,
+    download_documents,
+    download_memory,
+    zip_documents,
+)
+from core.exports import new_export_path, read_export
+from core.jobs import DONE, default_runner, job_memory
+from core.session import (
+    job_active,
+    remember_job,
+    remembered_job,
+    session_owner,
+    session_tokens,
+    show_job,
+)
+from core.snapshots import default_cache, iter_employees_cached
 
 
-def fetch_employees(base_url: str, token: str, include_inactive: bool) -> list:
-    url = f"{base_url}/employees?" f"includeInactive={str(include_inactive).lower()}"
-    headers = {
-        "Content-Type": "application/json",
-        "Api-Version": "v3",
-        "Access-Token": token,
-    }
-    resp = requests.get(url, headers=headers)
-    resp.raise_for_status()
-    return resp.json().get("employees", [])
+# Document export page for counting and downloading employee documents
 
+# Output choices and the ZIP layout they map to (None: one file per document)
+OUTPUT_MODES = {
+    "Folder tree (one file per document)": None,
+    "ZIP per employee": "employee",
+    "ZIP per field": "field",
+    "Single ZIP (browser download)": "single",
+}
 
-# Document export page for counting and downloading employee documents
+
+def run_document_download(
+    job,
+    client,
+    selected_doc_fields,
+    identifier,
+    output_folder,
+    include_inactive,
+    workers=DEFAULT_DOWNLOAD_WORKERS,
+    resume=True,
+    retry_failed=False,
+    dedupe=False,
+    layout=None,
+):
+    """Background job: download the selected documents into output_folder,
+    or straight into ZIP archives with ``layout`` (see zip_documents).
+
+    Returns download_documents' result plus the path of the single archive
+    to offer for download (None otherwise).
+    """
+    client.bandwidth = job.bandwidth
+    export_path = None
+    if layout == "single":
+        export_path = new_export_path(".zip")
+    else:
+        os.makedirs(output_folder, exist_ok=True)
+    # Stream employees for downloading documents, keeping only the
+    # selected document fields and the identifier
+    wanted = {sel.split(":")[0] for sel in selected_doc_fields}
+    wanted.add(identifier.split(":")[0])
+    try:
+        # Count first (served from the snapshot cache) so progress has an ETA
+        counts = count_documents(
+            iter_employees_cached(client, include_inactive, fields=wanted),
+            selected_doc_fields,
+        )
+        job.set_total(sum(counts.values()))
+        employees = iter_employees_cached(client, include_inactive, fields=wanted)
+        if layout:
+            result = zip_documents(
+                client,
+                employees,
+                selected_doc_fields,
+                identifier,
+                export_path or output_folder,
+                layout,
+                progress=job.advance,
+                workers=workers,
+            )
+        else:
+            result = download_documents(
+                client,
+                employees,
+                selected_doc_fields,
+                identifier,
+                output_folder,
+                progress=job.advance,
+                workers=workers,
+                resume=resume,
+                retry_failed=retry_failed,
+                dedupe=dedupe,
+            )
+        return (*result, export_path)
+    except requests.HTTPError as e:
+        if export_path:
+            os.remove(export_path)
+        raise RuntimeError(
+            f"Failed to load employees for download!\n"
+            f"URL: {e.response.request.url}\n"
+            f"Status code: {e.response.status_code}\n"
+            f"Response: {e.response.text}"
+        ) from e
+    except BaseException:
+        if export_path:
+            os.remove(export_path)
+        raise
 
 
 def render_document_export(go_to):
@@ -87,63 +171,28 @@ def render_document_export(go_to):
                 "Please fill Domain, Client ID and Client Secret before loading fields."
             )
             return
-        base_url = f"https://{domain}.catalystone.com/mono/api"
-        # Manually fetch token to avoid outdated cache
-        token_url = f"{base_url}/accesstoken"
-        token_resp = requests.get(
-            token_url,
-            headers={
-                "Client-Id": client_id.strip(),
-                "Client-Secret": client_secret.strip(),
-                "Grant-Type": "client_credentials",
-                "Api-Version": "v3",
-            },
+        client = ApiClient(
+            base_url_for(domain), client_id, client_secret, tokens=session_tokens()
         )
-        if not token_resp.ok:
-            st.error(f"Failed to retrieve access token: {token_resp.text}")
-            return
-        token_data = token_resp.json()
-        token = token_data.get("access_token")
-        if not token:
-            st.error(f"No access_token in response: {token_data}")
+        try:
+            client.token
+        except Exception as e:
+            st.error(f"Failed to retrieve access token: {e}")
             return
-        st.session_state.doc_token = token
-        # Fetch employees for field discovery
-        resp = requests.get(
-            f"{base_url}/employees",
-            headers={
-                "Access-Token": token,
-                "Api-Version": "v3",
-                "Accept": "application/json",
-            },
-        )
-        if not resp.ok:
+        # Stream employees for field discovery
+        try:
+            opts, d_opts = document_field_options(
+                iter_employees_cached(client, include_inactive)
+            )
+        except requests.HTTPError as e:
             st.error(
                 f"Failed to load employees!\n"
-                f"URL: {resp.request.url}\n"
-                f"Status code: {resp.status_code}\n"
-                f"Response: {resp.text}"
+                f"URL: {e.response.request.url}\n"
+                f"Status code: {e.response.status_code}\n"
+                f"Response: {e.response.text}"
             )
             return
-        employees = resp.json().get("employees", [])
-        opts = []
-        for emp in employees:
-            for fid, fld in emp.get("field", {}).items():
-                ftype = fld.get("type")
-                if ftype in ("PHOTO", "DOCUMENTSINGLE", "DOCUMENTMULTIPLE"):
-                    name = fld.get("name", f"Field {fid}")
-                    label = f"{fid}: {name} ({ftype})"
-                    if label not in opts:
-                        opts.append(label)
-        opts.sort()
         st.session_state.doc_field_opts = opts
-        id_opts = [
-            f"{fid}: {fld.get('name', f'Field {fid}')}"
-            for emp in employees
-            for fid, fld in emp.get("field", {}).items()
-            if fid.startswith(("47", "0", "7", "101"))
-        ]
-        d_opts = sorted(set(id_opts), key=lambda x: int(x.split(":")[0]))
         st.session_state["id_opts_docs"] = d_opts
         st.success(f"Loaded {len(opts)} document fields.")
 
@@ -151,16 +200,66 @@ def render_document_export(go_to):
         "Load document fields", on_click=load_doc_fields, key="btn_load_doc_fields"
     )
 
+    # Drop cached /employees snapshots so the next action fetches fresh data
+    if st.button("Refresh employee data", key="btn_refresh_employees"):
+        if domain:
+            default_cache().invalidate(base_url_for(domain))
+            st.info("Cached employee data cleared. The next fetch goes to the API.")
+        else:
+            st.error("Please fill Domain.")
+
     st.subheader("Settings", divider="violet")
 
     include_inactive = st.checkbox(
         "Include inactive employees", key="doc_include_inactive"
     )
-    output_folder = st.text_input(
-        "Download folder path",
-        key="doc_output_folder",
-        placeholder="e.g. /Users/rickard/Downloads",
+    output_mode = st.radio(
+        "Output",
+        list(OUTPUT_MODES),
+        horizontal=True,
+        key="doc_output_mode",
+        help="The ZIP modes write each document straight into its archive, named "
+        "like Zipper names them, without a folder tree on disk.",
     )
+    layout = OUTPUT_MODES[output_mode]
+    output_folder = ""
+    if layout != "single":
+        output_folder = st.text_input(
+            "Download folder path",
+            key="doc_output_folder",
+            placeholder="e.g. /Users/rickard/Downloads",
+        )
+
+    workers = st.number_input(
+        "Parallel downloads",
+        min_value=1,
+        max_value=32,
+        value=DEFAULT_DOWNLOAD_WORKERS,
+        key="doc_workers",
+        help="Documents fetched at once. The toolbox still slows down "
+        "automatically if the tenant starts throttling.",
+    )
+
+    resume, retry_failed, dedupe = True, False, False
+    if layout is None:
+        resume = st.checkbox(
+            "Skip documents already downloaded to this folder",
+            value=True,
+            key="doc_resume",
+            help="Each download folder keeps a manifest of finished documents, so "
+            "an interrupted download continues where it stopped.",
+        )
+        retry_failed = st.checkbox(
+            "Retry failed documents only", key="doc_retry_failed"
+        )
+        dedupe = st.checkbox(
+            "Store identical documents once (hardlinks)",
+            key="doc_dedupe",
+            help="Documents shared by many employees (policies, default photos) "
+            "are downloaded and stored once; each employee folder gets a "
+            "hardlink. Treat the files as read-only: editing one changes all its "
+            "copies.",
+        )
 
     identifier = None
     if st.session_state.get("id_opts_docs"):
@@ -184,52 +283,30 @@ def render_document_export(go_to):
         if not (domain and client_id and client_secret):
             st.error("Please fill Domain, Client ID and Client Secret.")
         else:
-            base_url = f"https://{domain}.catalystone.com/mono/api"
             try:
-                # Reuse previously loaded access token
-                token = st.session_state.get("doc_token")
-                if not token:
-                    st.error(
-                        "Access token missing. Please click 'Load document fields' first."
-                    )
-                    return
-                # Fetch employees for counting documents
-                resp = requests.get(
-                    f"{base_url}/employees",
-                    headers={
-                        "Access-Token": token,
-                        "Api-Version": "v3",
-                        "Accept": "application/json",
-                    },
+                client = ApiClient(
+                    base_url_for(domain),
+                    client_id,
+                    client_secret,
+                    tokens=session_tokens(),
                 )
-                if not resp.ok:
+                # Stream employees for counting documents, keeping only the
+                # selected document fields
+                wanted = {sel.split(":")[0] for sel in selected_doc_fields}
+                try:
+                    employees = iter_employees_cached(
+                        client, include_inactive, fields=wanted
+                    )
+                except requests.HTTPError as e:
                     st.error(
                         f"Failed to load employees for count!\n"
-                        f"URL: {resp.request.url}\n"
-                        f"Status code: {resp.status_code}\n"
-                        f"Response: {resp.text}"
+                        f"URL: {e.response.request.url}\n"
+                        f"Status code: {e.response.status_code}\n"
+                        f"Response: {e.response.text}"
                     )
                     return
-                employees = resp.json().get("employees", [])
                 # Aggregate document counts per type
-                counts = {
-                    ftype: 0
-                    for ftype in ("DOCUMENTSINGLE", "DOCUMENTMULTIPLE", "PHOTO")
-                }
-                for emp in employees:
-                    for sel in selected_doc_fields:
-                        fid = sel.split(":")[0]
-                        fld = emp.get("field", {}).get(fid)
-                        if not fld:
-                            continue
-                        ftype = fld.get("type")
-                        data = fld.get("data")
-                        if ftype == "DOCUMENTSINGLE" and data:
-                            counts[ftype] += 1
-                        elif ftype == "PHOTO" and data:
-                            counts[ftype] += 1
-                        elif ftype == "DOCUMENTMULTIPLE" and isinstance(data, list):
-                            counts[ftype] += len(data)
+                counts = count_documents(employees, selected_doc_fields)
                 # Display summary
                 st.write("### Document Counts")
                 st.write(f"• Single docs: {counts['DOCUMENTSINGLE']}")
@@ -238,157 +315,82 @@ def render_document_export(go_to):
             except Exception as e:
                 st.error(f"Error counting documents: {e}")
 
-    # Download documents
-    if st.button("Download Documents", key="btn_download_docs"):
-        if not (domain and client_id and client_secret and output_folder):
-            st.error("Please fill Domain, credentials, and output folder.")
+    # Download documents in a background job
+    # One download per session at a time: two into the same folder would
+    # clear each other's partial files and share the manifest
+    busy = job_active("docs_job")
+    if st.button(
+        "Download Documents",
+        key="btn_download_docs",
+        disabled=busy,
+        help="Wait for the current download to finish, or cancel it." if busy else None,
+    ):
+        if not (domain and client_id and client_secret):
+            st.error("Please fill Domain and credentials.")
+        elif layout != "single" and not output_folder:
+            st.error("Please fill the output folder.")
+        elif not identifier:
+            st.error("Please select an identifier before downloading.")
         else:
-            if not identifier:
-                st.error("Please select an identifier before downloading.")
-                return
-            os.makedirs(output_folder, exist_ok=True)
-            base_url = f"https://{domain}.catalystone.com/mono/api"
-            try:
-                # Reuse previously loaded access token
-                token = st.session_state.get("doc_token")
-                if not token:
-                    st.error(
-                        "Access token missing. Please click 'Load document fields' first."
-                    )
-                    return
-                # Prepare per-field folders
-                for sel in selected_doc_fields:
-                    fid, name_type = sel.split(": ", 1)
-                    field_name = name_type.rsplit(" (", 1)[0]
-                    os.makedirs(os.path.join(output_folder, field_name), exist_ok=True)
-                # Fetch employees for downloading documents
-                resp = requests.get(
-                    f"{base_url}/employees",
-                    headers={
-                        "Access-Token": token,
-                        "Api-Version": "v3",
-                        "Accept": "application/json",
-                    },
-                )
-                if not resp.ok:
-                    st.error(
-                        f"Failed to load employees for download!\n"
-                        f"URL: {resp.request.url}\n"
-                        f"Status code: {resp.status_code}\n"
-                        f"Response: {resp.text}"
-                    )
-                    return
-                employees = resp.json().get("employees", [])
-                errors = []
-                total_to_download = 0
-                total_downloaded = 0
-                for emp in employees:
-                    username = emp.get("username")
-                    for sel in selected_doc_fields:
-                        fid, name_type = sel.split(": ", 1)
-                        field_name = name_type.rsplit(" (", 1)[0]
-                        fld = emp.get("field", {}).get(fid)
-                        if not fld:
-                            continue
-                        ftype = fld.get("type")
-                        data = fld.get("data")
-                        if ftype in ("DOCUMENTSINGLE", "PHOTO") and isinstance(
-                            data, dict
-                        ):
-                            total_to_download += 1
-                            link = data.get("link", {}).get("href")
-                            if link:
-                                try:
-                                    r = requests.get(
-                                        link,
-                                        headers={
-                                            "Access-Token": token,
-                                            "Api-Version": "v3",
-                                            "Accept": "application/json",
-                                        },
-                                    )
-                                    r.raise_for_status()
-                                    ext = data.get("extension", "dat")
-                                    title = data.get("title", "").strip() or fid
-                                    # Sanitize title
-                                    safe_title = "".join(
-                                        c
-                                        for c in title
-                                        if c.isalnum() or c in (" ", "_", "-")
-                                    ).rstrip()
-                                    fid_id = identifier.split(":")[0]
-                                    emp_name = (
-                                        emp.get("field", {})
-                                        .get(fid_id, {})
-                                        .get("data", {})
-                                        .get("value")
-                                    ) or emp.get("username")
-                                    emp_dir = os.path.join(
-                                        output_folder,
-                                        field_name,
-                                        emp_name or emp.get("username"),
-                                    )
-                                    os.makedirs(emp_dir, exist_ok=True)
-                                    filename = f"{safe_title}.{ext}"
-                                    path = os.path.join(emp_dir, filename)
-                                    with open(path, "wb") as f:
-                                        f.write(r.content)
-                                    total_downloaded += 1
-                                except Exception as e:
-                                    errors.append(f"{username} fid {fid}: {e}")
-                        elif ftype == "DOCUMENTMULTIPLE" and isinstance(data, list):
-                            for idx, item in enumerate(data):
-                                total_to_download += 1
-                                link = item.get("link", {}).get("href")
-                                if link:
-                                    try:
-                                        r = requests.get(
-                                            link,
-                                            headers={
-                                                "Access-Token": token,
-                                                "Api-Version": "v3",
-                                                "Accept": "application/json",
-                                            },
-                                        )
-                                        r.raise_for_status()
-                                        ext = item.get("extension", "dat")
-                                        title = (
-                                            item.get("title", "").strip()
-                                            or f"{fid}_{idx}"
-                                        )
-                                        safe_title = "".join(
-                                            c
-                                            for c in title
-                                            if c.isalnum() or c in (" ", "_", "-")
-                                        ).rstrip()
-                                        fid_id = identifier.split(":")[0]
-                                        emp_name = (
-                                            emp.get("field", {})
-                                            .get(fid_id, {})
-                                            .get("data", {})
-                                            .get("value")
-                                        ) or emp.get("username")
-                                        emp_dir = os.path.join(
-                                            output_folder,
-                                            field_name,
-                                            emp_name or emp.get("username"),
-                                        )
-                                        os.makedirs(emp_dir, exist_ok=True)
-                                        filename = f"{safe_title}.{ext}"
-                                        path = os.path.join(emp_dir, filename)
-                                        with open(path, "wb") as f:
-                                            f.write(r.content)
-                                        total_downloaded += 1
-                                    except Exception as e:
-                                        errors.append(
-                                            f"{username} fid {fid} idx {idx}: {e}"
-                                        )
-                st.write(
-                    f"Downloaded {total_downloaded} of {total_to_download} documents."
+            client = ApiClient(
+                base_url_for(domain),
+                client_id,
+                client_secret,
+                tokens=session_tokens(),
+            )
+            # Remove the archive of the previous download of this session
+            previous = remembered_job("docs_job")
+            if previous and previous.status == DONE and previous.result[-1]:
+                if os.path.exists(previous.result[-1]):
+                    os.remove(previous.result[-1])
+            job = default_runner().submit(
+                "document_download",
+                run_document_download,
+                client,
+                selected_doc_fields,
+                identifier,
+                output_folder,
+                include_inactive,
+                workers=int(workers),
+                resume=resume,
+                retry_failed=retry_failed,
+                dedupe=dedupe,
+                layout=layout,
+                label="Document download",
+                owner=session_owner(),
+                memory=job_memory(download_memory(int(workers), layout)),
+            )
+            remember_job("docs_job", job)
+
+    def show_download(result):
+        total_downloaded, total_to_download, errors, stats, export_path = result
+        st.write(f"Downloaded {total_downloaded} of {total_to_download} documents.")
+        if "archives" in stats:
+            st.write(f"Wrote {stats['archives']} ZIP archive(s).")
+        if stats["skipped"]:
+            st.write(
+                f"Skipped {stats['skipped']} documents that did not need downloading."
+            )
+        if stats["reused"]:
+            st.write(
+                f"Reused {stats['reused']} identical documents without a download."
+            )
+        st.caption(describe_throughput(stats))
+        if errors:
+            st.error(f"Errors downloading documents:\n" + "\n".join(errors))
+        else:
+            st.success("All documents downloaded successfully.")
+        if export_path:
+            if os.path.exists(export_path):
+                # Deferred download: the file is only read when clicked
+                st.download_button(
+                    label="Download ZIP",
+                    data=partial(read_export, export_path),
+                    file_name="documents.zip",
+                    mime="application/zip",
+                    key="download_docs_zip",
                 )
-                if errors:
-                    st.error(f"Errors downloading documents:\n" + "\n".join(errors))
-                else:
-                    st.success("All documents downloaded successfully.")
-            except Exception as e:
-                st.error(f"Error during document download: {e}")
+            else:
+                st.warning("The archive has expired. Please run the download again.")
+
+    show_job("docs_job", show_download, unit="documents")
@@ -1,43 +1,131 @@
 # tctoolbox/pages/historical_export.py
 import streamlit as st
-import os, csv, json
-import io, zipfile
+import os
 from datetime import datetime
-
-import requests
-
-# --- API Authentication and Data Fetching Functions ---
-
-
-def get_token(base_url, client_id, client_secret):
-    headers = {
-        "Client-Id": client_id.strip(),
-        "Client-Secret": client_secret.strip(),
-        "Grant-Type": "client_credentials",
-        "Api-Version": "v3",
-    }
-    url = f"{base_url}/accesstoken"
-    response = requests.get(url, headers=headers)
-    response.raise_for_status()
-    return response.json().get("access_token", "")
-
-
-def fetch_employees(base_url, token, include_inactive=False, since_date=None):
-    # Fetch employee data from the API with optional filters for inactive employees and history since a date
-    headers = {
-        "Access-Token": token,
-        "Api-Version": "v3",
-        "Content-Type": "application/json",
+from functools import partial
+
+from core.api import ApiClient, base_url_for
+from core.archive import COMPRESSION_METHODS, compression_memory
+from core.asof import parse_dates, write_asof_csv
+from core.checkpoints import HistoryCheckpoint
+from core.exports import new_export_path, read_export
+from core.history import (
+    aggregate_fields,
+    write_history_parquet,
+    write_history_zip,
+)
+from core.jobs import DONE, default_runner, job_memory
+from core.session import (
+    job_active,
+    remember_job,
+    remembered_job,
+    session_owner,
+    session_tokens,
+    show_job,
+)
+from core.snapshots import default_cache, iter_employees_cached
+
+
+def run_history_export(
+    job,
+    client,
+    identifier,
+    selected_fields,
+    wanted=None,
+    include_inactive=False,
+    since_date=None,
+    exclude_current=False,
+    delta=False,
+    parquet=False,
+    write_debug=False,
+    prefix="historical_",
+    compression=None,
+    compresslevel=None,
+    workers=1,
+    as_of=None,
+):
+    """Background job: write the export to disk and describe the download.
+
+    With ``as_of`` (sorted yyyy-MM-dd dates) the export is an as-of snapshot
+    CSV instead, fetched with history since the earliest date.
+
+    A delta run returns its checkpoint unsaved: it only advances once the
+    export is downloaded, so an export that expires unread is not lost.
+    """
+    client.bandwidth = job.bandwidth
+    # The export is written to disk; the job result only holds its path
+    suffix = ".csv" if as_of else ".parquet" if parquet else ".zip"
+    export_path = new_export_path(suffix)
+    checkpoint = None
+    message = "Export ready for download."
+    try:
+        if delta:
+            # Delta runs always go to the API: a cached snapshot could
+            # predate the checkpoint and hide changes
+            checkpoint = HistoryCheckpoint.load(
+                client, identifier, selected_fields, include_inactive
+            )
+            if checkpoint.last_run is not None:
+                message = (
+                    "Delta export of changes since "
+                    f"{checkpoint.last_run:%Y-%m-%d %H:%M} UTC ready for download."
+                )
+            employees = checkpoint.filter(
+                client.iter_employees(
+                    include_inactive,
+                    checkpoint.since_date or since_date,
+                    fields=wanted,
+                ),
+                identifier,
+                selected_fields,
+            )
+        else:
+            # Stream employees including history since the specified date;
+            # the export visits each employee once
+            employees = iter_employees_cached(
+                client,
+                include_inactive,
+                as_of[0] if as_of else since_date,
+                fields=wanted,
+            )
+        employees = job.track(employees)
+        if as_of:
+            write_asof_csv(employees, identifier, selected_fields, as_of, export_path)
+            message = f"Snapshot as of {', '.join(as_of)} ready for download."
+        elif parquet:
+            write_history_parquet(
+                employees, identifier, selected_fields, export_path, exclude_current
+            )
+        else:
+            write_history_zip(
+                employees,
+                identifier,
+                selected_fields,
+                export_path,
+                exclude_current,
+                write_debug,
+                prefix,
+                compression,
+                compresslevel,
+                workers,
+            )
+    except BaseException:
+        os.remove(export_path)
+        raise
+    if as_of:
+        label, mime = "Download CSV", "text/csv"
+    elif parquet:
+        label, mime = "Download Parquet", "application/vnd.apache.parquet"
+    else:
+        label, mime = "Download ZIP", "application/zip"
+    return {
+        "path": export_path,
+        "filename": f"{prefix}{'as_of' if as_of else 'export'}{suffix}",
+        "label": label,
+        "mime": mime,
+        "message": message,
+        "checkpoint": checkpoint,
     }
-    params = {}
-    if include_inactive:
-        params["includeInactive"] = "true"
-    if since_date:
-        params["timelineSince"] = since_date
-    url = f"{base_url}/employees"
-    response = requests.get(url, headers=headers, params=params)
-    response.raise_for_status()
-    return response.json().get("employees", [])
 
 
 def render_export(go_to):
@@ -89,23 +177,14 @@ def render_export(go_to):
                 "Please fill Domain, Client ID and Client Secret."
             )
             return
-        base_url = f"https://{domain}.catalystone.com/mono/api"
+        client = ApiClient(
+            base_url_for(domain), client_id, client_secret, tokens=session_tokens()
+        )
         try:
-            token = get_token(base_url, client_id, client_secret)
-            # Fetch employees without history for field aggregation
-            employees = fetch_employees(base_url, token, include_inactive)
-            # Aggregate fields across all employees
-            field_map = {}
-            for emp in employees:
-                for fid, fld in emp.get("field", {}).items():
-                    field_map[fid] = fld.get("name", "")
-            options = [
-                f"{fid}: {name}"
-                for fid, name in sorted(field_map.items(), key=lambda x: int(x[0]))
-            ]
-            id_opts = [
-                opt for opt in options if opt.startswith(("47:", "0:", "7:", "101:"))
-            ]
+            # Aggregate fields while streaming employees (without history)
+            options, id_opts = aggregate_fields(
+                iter_employees_cached(client, include_inactive)
+            )
             st.session_state.options = options
             st.session_state.id_opts = id_opts
             # st.session_state.employees = employees
@@ -116,6 +195,14 @@ def render_export(go_to):
 
     st.button("Load fields", on_click=load_fields_cb, key="btn_load_fields")
 
+    # Drop cached /employees snapshots so the next action fetches fresh data
+    if st.button("Refresh employee data", key="btn_refresh_employees"):
+        if domain:
+            default_cache().invalidate(base_url_for(domain))
+            st.info("Cached employee data cleared. The next fetch goes to the API.")
+        else:
+            st.error("Please fill Domain.")
+
     if "load_error" in st.session_state:
         st.error(st.session_state.load_error)
 
@@ -127,9 +214,61 @@ def render_export(go_to):
 
     include_inactive = st.checkbox("Include inactive employees", key="include_inactive")
 
-    exclude_current = st.checkbox("Exclude the current value", key="exclude_current")
+    output_format = st.radio(
+        "Output format",
+        [
+            "ZIP of CSV files",
+            "Parquet (single typed file)",
+            "As-of snapshot (CSV, one row per employee and date)",
+        ],
+        horizontal=True,
+        key="output_format",
+    )
+    parquet = output_format.startswith("Parquet")
+    as_of = output_format.startswith("As-of")
+
+    exclude_current = False
+    delta = False
+    if not as_of:
+        exclude_current = st.checkbox(
+            "Exclude the current value", key="exclude_current"
+        )
+
+        delta = st.checkbox(
+            "Delta export (only changes since the last run of this export)",
+            key="delta_export",
+            help="The first run exports everything since the date below and saves "
+            "a checkpoint; later runs only fetch and export what changed after it.",
+        )
 
-    write_debug = st.checkbox("Write complete JSON-file (backup)", key="write_debug")
+    write_debug = False
+    compression = "Deflate"
+    compresslevel = None
+    parallel = False
+    if output_format == "ZIP of CSV files":
+        write_debug = st.checkbox(
+            "Write complete backup (gzip'd NDJSON, one employee per line)",
+            key="write_debug",
+        )
+
+        # --- ZIP Compression ---
+        compression = st.radio(
+            "ZIP compression",
+            ["Deflate", "Store (no compression)"],
+            horizontal=True,
+            key="zip_compression",
+        )
+        if compression == "Deflate":
+            compresslevel = st.slider(
+                "Compression level (1 = fastest, 9 = smallest)",
+                min_value=1,
+                max_value=9,
+                value=6,
+                key="zip_compresslevel",
+            )
+            parallel = st.checkbox(
+                "Compress in parallel on all CPU cores", key="zip_parallel"
+            )
 
     # Initialize session state variables if not present
     if "options" not in st.session_state:
@@ -143,11 +282,22 @@ def render_export(go_to):
     employees = st.session_state.employees
 
     # --- Date Input for History Filter ---
-    since_date = st.text_input(
-        "History since (yyyy-MM-dd)",
-        value=datetime.today().strftime("%Y-%m-%d"),
-        key="since_date",
-    )
+    since_date = None
+    as_of_text = ""
+    if as_of:
+        as_of_text = st.text_input(
+            "As-of dates (yyyy-MM-dd, comma-separated)",
+            value=datetime.today().strftime("%Y-%m-%d"),
+            key="as_of_dates",
+            help="Each employee gets one row per date, holding the value every "
+            "selected field had on that date.",
+        )
+    else:
+        since_date = st.text_input(
+            "History since (yyyy-MM-dd)",
+            value=datetime.today().strftime("%Y-%m-%d"),
+            key="since_date",
+        )
 
     identifier = None
     selected_fields = []
@@ -160,7 +310,7 @@ def render_export(go_to):
         )
     prefix = st.text_input("Output filename prefix", value="historical_", key="prefix")
 
-    # Callback to run the export process and generate a ZIP archive with CSVs
+    # Callback to start the export as a background job
     def run_export_cb():
         if not (options and identifier and selected_fields):
             st.session_state.export_error = (
@@ -174,85 +324,109 @@ def render_export(go_to):
             )
             return
 
-        base_url = f"https://{domain}.catalystone.com/mono/api"
-        try:
-            token = get_token(base_url, client_id, client_secret)
-            # Fetch employees including history since the specified date
-            employees = fetch_employees(base_url, token, include_inactive, since_date)
-        except Exception as e:
-            st.error(f"Error fetching employees: {e}")
-            return
-
-        logs = []
-        id_fid, id_name = identifier.split(": ", 1)
-
-        zip_buffer = io.BytesIO()
-        with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
-            for item in selected_fields:
-                fid, fname = item.split(": ", 1)
-                safe = "".join(c if c.isalnum() else "_" for c in fname).strip("_")
-                csv_buffer = io.StringIO()
-                writer = csv.writer(csv_buffer, delimiter=";")
-                # Write CSV header row
-                writer.writerow(
-                    [id_name, "Name", "Username", fname, "Valid From", "Valid To"]
-                )
-                # Write data rows for each employee and timeline entry
-                for emp in employees:
-                    id_val = (
-                        emp.get("field", {})
-                        .get(id_fid, {})
-                        .get("data", {})
-                        .get("value", "")
-                    )
-                    for rec in (
-                        emp.get("field", {}).get(fid, {}).get("timelineChange", [])
-                    ):
-                        vf = rec.get("dataValidFrom") or rec.get("lastModified")
-                        vt = rec.get("dataValidTo") or ""
-                        if exclude_current and not vt:
-                            continue
-                        d = rec.get("data")
-                        if isinstance(d, dict):
-                            val = (
-                                d.get("value") or d.get("alternativeExportValue") or ""
-                            )
-                        elif isinstance(d, list):
-                            val = ";".join(x.get("value", "") for x in d)
-                        else:
-                            val = ""
-                        writer.writerow(
-                            [id_val, emp.get("name"), emp.get("username"), val, vf, vt]
-                        )
-                # Add CSV to ZIP archive
-                zip_file.writestr(f"{prefix}{safe}.csv", csv_buffer.getvalue())
-
-            # Optionally write full JSON backup to ZIP
-            if write_debug:
-                zip_file.writestr(
-                    f"{prefix}debug.json",
-                    json.dumps(employees, ensure_ascii=False, indent=2),
-                )
+        as_of_dates = None
+        if as_of:
+            try:
+                as_of_dates = parse_dates(as_of_text)
+            except ValueError as e:
+                st.session_state.export_error = str(e)
+                return
+
+        id_fid = identifier.split(": ", 1)[0]
+        # Only the identifier and selected fields are needed, unless the
+        # complete JSON backup is requested
+        wanted = None
+        if not write_debug:
+            wanted = {id_fid} | {item.split(": ", 1)[0] for item in selected_fields}
+
+        client = ApiClient(
+            base_url_for(domain), client_id, client_secret, tokens=session_tokens()
+        )
+        # Remove the file of the previous export of this session
+        previous = remembered_job("history_job")
+        if previous and previous.status == DONE and previous.result:
+            if os.path.exists(previous.result["path"]):
+                os.remove(previous.result["path"])
 
-        zip_buffer.seek(0)
         st.session_state.pop("export_error", None)
-        st.session_state.export_ready = {
-            "zip": zip_buffer.getvalue(),
-            "filename": f"{prefix}export.zip",
-            "message": "Export ready for download.",
-        }
+        workers = (os.cpu_count() or 1) if parallel else 1
+        job = default_runner().submit(
+            "history_export",
+            run_history_export,
+            client,
+            identifier,
+            selected_fields,
+            wanted=wanted,
+            include_inactive=include_inactive,
+            since_date=since_date,
+            exclude_current=exclude_current,
+            delta=delta,
+            parquet=parquet,
+            write_debug=write_debug,
+            prefix=prefix,
+            compression=COMPRESSION_METHODS[
+                "deflate" if compression == "Deflate" else "store"
+            ],
+            compresslevel=compresslevel,
+            workers=workers,
+            as_of=as_of_dates,
+            label="Historical Export",
+            owner=session_owner(),
+            # Parallel compression processes count against the job budget
+            memory=job_memory(compression_memory(workers)),
+        )
+        remember_job("history_job", job)
+
+    busy = job_active("history_job")
+    st.button(
+        "Run Export",
+        on_click=run_export_cb,
+        key="btn_run_export",
+        disabled=busy,
+        help="Wait for the current export to finish, or cancel it." if busy else None,
+    )
 
-    st.button("Run Export", on_click=run_export_cb, key="btn_run_export")
+    # Forget the delta checkpoint so the next run exports everything again
+    if delta and st.button("Reset delta checkpoint", key="btn_reset_checkpoint"):
+        if domain and client_id and client_secret and identifier and selected_fields:
+            client = ApiClient(base_url_for(domain), client_id, client_secret)
+            HistoryCheckpoint.load(
+                client, identifier, selected_fields, include_inactive
+            ).reset()
+            st.info("Checkpoint cleared. The next delta run exports everything.")
+        else:
+            st.error("Please fill credentials and choose identifier & fields.")
 
     if "export_error" in st.session_state:
         st.error(st.session_state.export_error)
 
-    if "export_ready" in st.session_state:
-        st.success(st.session_state.export_ready["message"])
-        st.download_button(
-            label="Download ZIP",
-            data=st.session_state.export_ready["zip"],
-            file_name=st.session_state.export_ready["filename"],
-            mime="application/zip",
-            key="download_zip",
-        )
+    # Advance the delta checkpoint once its export has been downloaded
+    def save_checkpoint_cb(export):
+        checkpoint = export.get("checkpoint")
+        if checkpoint is not None:
+            checkpoint.save()
+            export["checkpoint"] = None
+
+    # Progress of the running export, or its download once finished
+    def show_export(export):
+        if os.path.exists(export["path"]):
+            st.success(export["message"])
+            # Deferred download: the file is only read when the button is clicked
+            st.download_button(
+                label=export["label"],
+                data=partial(read_export, export["path"]),
+                file_name=export["filename"],
+                mime=export["mime"],
+                key="download_zip",
+                on_click=save_checkpoint_cb,
+                args=(export,),
+            )
+            if export.get("checkpoint") is not None:
+                st.caption(
+                    "The delta checkpoint advances when you download this export; "
+                    "until then the next delta run includes these changes again."
+                )
+        else:
+            st.warning("The export has expired. Please run it again.")
+
+    show_job("history_job", show_export, unit="employees")
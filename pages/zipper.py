@@ -1,23 +1,8 @@
 # tctoolbox/pages/zipper.py
 import streamlit as st
 import os
-import zipfile
 
-
-# Inlined from utils.py
-def zip_person_files(person_folder: str, zip_output_path: str) -> int:
-    """Compress all files in a person_folder into a single ZIP. Returns number of files compressed."""
-    file_count = 0
-    with zipfile.ZipFile(zip_output_path, "w", zipfile.ZIP_DEFLATED) as zipf:
-        for filename in os.listdir(person_folder):
-            file_path = os.path.join(person_folder, filename)
-            if os.path.isfile(file_path):
-                try:
-                    zipf.write(file_path, filename)
-                    file_count += 1
-                except Exception:
-                    pass
-    return file_count
+from core.zipper import zip_document_folders, zip_photos
 
 
 def render_zipper(go_to):
@@ -93,39 +78,17 @@ def render_zipper(go_to):
             return
         os.makedirs(output_folder, exist_ok=True)
 
-        # Initialize counters
-        total_items = 0
-        total_converted = 0
-        total_failed = 0
-
         try:
             if mode == "Document-folders":
-                # Existing per-folder zipping
-                for dir_name in os.listdir(root_folder):
-                    subfolder = os.path.join(root_folder, dir_name)
-                    if os.path.isdir(subfolder) and dir_name.isdigit():
-                        total_items += 1
-                        zip_path = os.path.join(output_folder, f"{dir_name}.zip")
-                        num = zip_person_files(subfolder, zip_path)
-                        if num > 0:
-                            total_converted += 1
-                        else:
-                            total_failed += 1
+                # Per-folder zipping
+                total_items, total_converted, total_failed = zip_document_folders(
+                    root_folder, output_folder
+                )
             else:
                 # ZIP each photo file in root_folder individually
-                for filename in os.listdir(root_folder):
-                    if filename.lower().endswith(
-                        (".jpg", ".jpeg", ".png", ".bmp", ".gif")
-                    ):
-                        total_items += 1
-                        src = os.path.join(root_folder, filename)
-                        zip_name = os.path.splitext(filename)[0] + ".zip"
-                        zip_path = os.path.join(output_folder, zip_name)
-                        with zipfile.ZipFile(
-                            zip_path, "w", zipfile.ZIP_DEFLATED
-                        ) as zipf:
-                            zipf.write(src, filename)
-                            total_converted += 1
+                total_items, total_converted, total_failed = zip_photos(
+                    root_folder, output_folder
+                )
         except Exception as e:
             st.error(f"Error during zipping: {e}")
             return
@@ -0,0 +1,357 @@
+# tctoolbox/tctoolbox.py
+"""Headless entry points for the toolbox pages.
+
+    python tctoolbox.py history --domain acme --identifier 0 --fields 1000,1001
+    python tctoolbox.py documents --domain acme --identifier 0 --fields 500 --output-folder docs
+    python tctoolbox.py zip --mode folders --root docs/Contract --output zips
+    python tctoolbox.py fields --domain acme
+
+Credentials come from --client-id/--client-secret or the TCTOOLBOX_CLIENT_ID and
+TCTOOLBOX_CLIENT_SECRET environment variables.
+"""
+import argparse
+import os
+import sys
+from datetime import datetime
+
+from core.api import ApiClient, base_url_for
+from core.archive import COMPRESSION_METHODS
+from core.asof import parse_dates, write_asof_csv
+from core.checkpoints import HistoryCheckpoint
+from core.documents import (
+    DEFAULT_DOWNLOAD_WORKERS,
+    ZIP_LAYOUTS,
+    count_documents,
+    describe_throughput,
+    document_field_options,
+    download_documents,
+    zip_documents,
+)
+from core.fields import build_excel, fetch_field_overview
+from core.history import (
+    BACKUP_SUFFIX,
+    aggregate_fields,
+    tee_backup,
+    write_history_parquet,
+    write_history_zip,
+)
+from core.snapshots import default_cache, iter_employees_cached
+from core.zipper import zip_document_folders, zip_photos
+
+
+def _ids(value: str) -> list:
+    return [part.strip() for part in value.split(",") if part.strip()]
+
+
+def _client(args) -> ApiClient:
+    if not (args.domain and args.client_id and args.client_secret):
+        raise SystemExit(
+            "error: --domain, --client-id and --client-secret (or TCTOOLBOX_CLIENT_ID/"
+            "TCTOOLBOX_CLIENT_SECRET) are required"
+        )
+    if args.refresh:
+        default_cache().invalidate(base_url_for(args.domain))
+    return ApiClient(base_url_for(args.domain), args.client_id, args.client_secret)
+
+
+def _select(labels, ids, what) -> list:
+    """Pick the "<id>: ..." labels matching ``ids``, in the order given."""
+    by_id = {label.split(":", 1)[0]: label for label in labels}
+    missing = [fid for fid in ids if fid not in by_id]
+    if missing:
+        raise SystemExit(f"error: unknown {what} field ID(s): {', '.join(missing)}")
+    return [by_id[fid] for fid in ids]
+
+
+# --- Subcommands ---
+
+
+def cmd_history(args) -> int:
+    as_of = None
+    if args.as_of:
+        if args.delta:
+            raise SystemExit("error: --as-of cannot be combined with --delta")
+        try:
+            as_of = parse_dates(args.as_of)
+        except ValueError as e:
+            raise SystemExit(f"error: --as-of: {e}")
+        # The snapshot needs every timeline entry valid on the earliest date
+        args.since = as_of[0]
+    client = _client(args)
+    field_ids = _ids(args.fields)
+    wanted = None if args.backup else {args.identifier, *field_ids}
+    # Resolve labels first; the export pass is then served from the snapshot
+    # cache (delta runs resolve them without history and fetch changes only)
+    label_since = None if args.delta else args.since
+    options, _ = aggregate_fields(
+        iter_employees_cached(client, args.include_inactive, label_since, fields=wanted)
+    )
+    identifier = _select(options, [args.identifier], "identifier")[0]
+    selected = _select(options, field_ids, "history")
+    checkpoint = None
+    if args.delta:
+        checkpoint = HistoryCheckpoint.load(
+            client, identifier, selected, args.include_inactive
+        )
+        if args.reset_checkpoint:
+            checkpoint.reset()
+        employees = checkpoint.filter(
+            client.iter_employees(
+                args.include_inactive, checkpoint.since_date or args.since, wanted
+            ),
+            identifier,
+            selected,
+        )
+    else:
+        employees = iter_employees_cached(
+            client, args.include_inactive, args.since, fields=wanted
+        )
+    if as_of:
+        output = args.output or f"{args.prefix}as_of.csv"
+        write_asof_csv(employees, identifier, selected, as_of, output)
+    elif args.format == "parquet":
+        output = args.output or f"{args.prefix}export.parquet"
+        if args.backup:
+            employees = tee_backup(employees, f"{output}.backup{BACKUP_SUFFIX}")
+        write_history_parquet(
+            employees, identifier, selected, output, args.exclude_current
+        )
+    else:
+        output = args.output or f"{args.prefix}export.zip"
+        write_history_zip(
+            employees,
+            identifier,
+            selected,
+            output,
+            args.exclude_current,
+            args.backup,
+            args.prefix,
+            COMPRESSION_METHODS[args.compression],
+            args.level,
+            args.workers,
+        )
+    if checkpoint is not None:
+        checkpoint.save()
+    print(f"Exported {len(selected)} field(s) to {output}")
+    return 0
+
+
+def cmd_documents(args) -> int:
+    client = _client(args)
+    field_ids = _ids(args.fields)
+    wanted = {args.identifier, *field_ids}
+    doc_opts, id_opts = document_field_options(
+        iter_employees_cached(client, args.include_inactive, fields=wanted)
+    )
+    selected = _select(doc_opts, field_ids, "document")
+    if args.count_only:
+        counts = count_documents(
+            iter_employees_cached(client, args.include_inactive, fields=wanted),
+            selected,
+        )
+        print(f"Single docs: {counts['DOCUMENTSINGLE']}")
+        print(f"Multiple docs: {counts['DOCUMENTMULTIPLE']}")
+        print(f"Photos: {counts['PHOTO']}")
+        return 0
+    if not args.output_folder:
+        raise SystemExit("error: --output-folder is required unless --count-only")
+    identifier = _select(id_opts, [args.identifier], "identifier")[0]
+    os.makedirs(args.output_folder, exist_ok=True)
+    employees = iter_employees_cached(client, args.include_inactive, fields=wanted)
+    if args.zip:
+        target = args.output_folder
+        if args.zip == "single":
+            target = os.path.join(args.output_folder, "documents.zip")
+        downloaded, total, errors, stats = zip_documents(
+            client,
+            employees,
+            selected,
+            identifier,
+            target,
+            args.zip,
+            workers=args.workers,
+        )
+    else:
+        downloaded, total, errors, stats = download_documents(
+            client,
+            employees,
+            selected,
+            identifier,
+            args.output_folder,
+            workers=args.workers,
+            resume=not args.no_resume,
+            retry_failed=args.retry_failed,
+            dedupe=args.dedupe,
+        )
+    print(
+        f"Downloaded {downloaded} of {total} documents ({describe_throughput(stats)})."
+    )
+    if "archives" in stats:
+        print(f"Wrote {stats['archives']} ZIP archive(s).")
+    if stats["skipped"]:
+        print(f"Skipped {stats['skipped']} documents that did not need downloading.")
+    if stats["reused"]:
+        print(f"Reused {stats['reused']} identical documents without a download.")
+    for error in errors:
+        print(error, file=sys.stderr)
+    return 1 if errors else 0
+
+
+def cmd_zip(args) -> int:
+    os.makedirs(args.output, exist_ok=True)
+    if args.mode == "folders":
+        items, converted, failed = zip_document_folders(args.root, args.output)
+    else:
+        items, converted, failed = zip_photos(args.root, args.output)
+    print(f"Total items processed: {items}")
+    print(f"Successfully converted: {converted}")
+    print(f"Failed conversions: {failed}")
+    return 1 if failed else 0
+
+
+def cmd_fields(args) -> int:
+    client = _client(args)
+    df_fields, df_lists, df_orgs, warnings = fetch_field_overview(client)
+    for warn in warnings:
+        print(warn, file=sys.stderr)
+    if df_fields.empty and df_lists.empty and df_orgs.empty:
+        print("Unable to generate workbook: no data available.", file=sys.stderr)
+        return 1
+    output = args.output or f"{args.domain.replace('.', '_')}_field_overview.xlsx"
+    with open(output, "wb") as f:
+        f.write(build_excel(df_fields, df_lists, df_orgs).getvalue())
+    print(f"Wrote {output}")
+    return 0
+
+
+# --- Argument parsing ---
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="tctoolbox", description="Technical Consulting Toolbox (headless)"
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    api = argparse.ArgumentParser(add_help=False)
+    api.add_argument("--domain", required=True, help="e.g. reriksson.sb")
+    api.add_argument("--client-id", default=os.environ.get("TCTOOLBOX_CLIENT_ID"))
+    api.add_argument(
+        "--client-secret", default=os.environ.get("TCTOOLBOX_CLIENT_SECRET")
+    )
+    api.add_argument(
+        "--refresh", action="store_true", help="ignore cached employee data"
+    )
+
+    history = sub.add_parser(
+        "history", parents=[api], help="export employee history into CSV files"
+    )
+    history.add_argument("--identifier", required=True, help="identifier field ID")
+    history.add_argument("--fields", required=True, help="comma-separated field IDs")
+    history.add_argument(
+        "--since",
+        default=datetime.today().strftime("%Y-%m-%d"),
+        help="history since (yyyy-MM-dd, default: today)",
+    )
+    history.add_argument("--include-inactive", action="store_true")
+    history.add_argument("--exclude-current", action="store_true")
+    history.add_argument(
+        "--backup",
+        action="store_true",
+        help="add the complete backup as gzip'd NDJSON (next to a parquet file)",
+    )
+    history.add_argument("--prefix", default="historical_")
+    history.add_argument(
+        "--delta",
+        action="store_true",
+        help="only export changes since the last --delta run of this export",
+    )
+    history.add_argument(
+        "--reset-checkpoint",
+        action="store_true",
+        help="with --delta: start over with a full export",
+    )
+    history.add_argument(
+        "--format", choices=("zip", "parquet"), default="zip", help="output format"
+    )
+    history.add_argument(
+        "--as-of",
+        metavar="DATES",
+        help="comma-separated yyyy-MM-dd dates: write one CSV row per employee "
+        "and date with the field values on that date (replaces --since/--format)",
+    )
+    history.add_argument(
+        "--output", help="output path (default: <prefix>export.zip/.parquet/as_of.csv)"
+    )
+    history.add_argument(
+        "--compression", choices=tuple(COMPRESSION_METHODS), default="deflate"
+    )
+    history.add_argument(
+        "--level", type=int, choices=range(1, 10), help="deflate level (default: 6)"
+    )
+    history.add_argument(
+        "--workers", type=int, default=1, help="processes compressing in parallel"
+    )
+    history.set_defaults(func=cmd_history)
+
+    documents = sub.add_parser(
+        "documents", parents=[api], help="count or download employee documents"
+    )
+    documents.add_argument("--identifier", default="0", help="identifier field ID")
+    documents.add_argument(
+        "--fields", required=True, help="comma-separated document field IDs"
+    )
+    documents.add_argument("--include-inactive", action="store_true")
+    documents.add_argument("--output-folder")
+    documents.add_argument("--count-only", action="store_true")
+    documents.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_DOWNLOAD_WORKERS,
+        help="documents downloaded in parallel (default: %(default)s)",
+    )
+    documents.add_argument(
+        "--no-resume",
+        action="store_true",
+        help="download everything again, even documents the folder's manifest "
+        "lists as done",
+    )
+    documents.add_argument(
+        "--retry-failed",
+        action="store_true",
+        help="only retry documents that failed in the previous run",
+    )
+    documents.add_argument(
+        "--dedupe",
+        action="store_true",
+        help="store identical documents once and hardlink them into place",
+    )
+    documents.add_argument(
+        "--zip",
+        choices=ZIP_LAYOUTS,
+        help="write documents straight into ZIP archives instead of a folder tree: "
+        "<Field>/<Identifier>.zip, <Field>.zip or one documents.zip",
+    )
+    documents.set_defaults(func=cmd_documents)
+
+    zipper = sub.add_parser("zip", help="compress folders or images into ZIP archives")
+    zipper.add_argument("--mode", choices=("folders", "photos"), default="folders")
+    zipper.add_argument("--root", required=True, help="root folder path")
+    zipper.add_argument("--output", required=True, help="output folder path")
+    zipper.set_defaults(func=cmd_zip)
+
+    fields = sub.add_parser(
+        "fields", parents=[api], help="export an Excel overview of available fields"
+    )
+    fields.add_argument("--output", help="xlsx path")
+    fields.set_defaults(func=cmd_fields)
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
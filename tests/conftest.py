@@ -0,0 +1,6 @@
+# tctoolbox/tests/conftest.py
+import os
+import sys
+
+# The app runs from the repository root; make its packages importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,66 @@
+# tctoolbox/tests/test_api.py
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+import requests
+
+from core.api import ApiClient, get_session
+from core.retry import AdaptiveLimiter
+
+
+class _SetsCookie(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.cookies.append(self.headers.get("Cookie"))
+        self.send_response(200)
+        self.send_header("Set-Cookie", "lb=node-1; Path=/")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def test_shared_session_keeps_no_cookies():
+    server = HTTPServer(("127.0.0.1", 0), _SetsCookie)
+    server.cookies = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        url = f"http://127.0.0.1:{server.server_port}/"
+        session = get_session(pool_size=2)
+        session.get(url).close()
+        session.get(url).close()
+    finally:
+        server.shutdown()
+    assert len(session.cookies) == 0
+    assert server.cookies == [None, None]
+
+
+def test_request_errors_release_the_limiter_slot():
+    limiter = AdaptiveLimiter(initial=1, maximum=1)
+    client = ApiClient("http://127.0.0.1:1/api", "a", "b", limiter=limiter)
+    # A malformed document link fails before any connection is made
+    for _ in range(3):
+        with pytest.raises(requests.exceptions.MissingSchema):
+            client.send("not-a-url", {})
+    assert limiter.in_flight == 0
+
+
+def test_streamed_body_holds_its_slot_until_closed():
+    server = HTTPServer(("127.0.0.1", 0), _SetsCookie)
+    server.cookies = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    limiter = AdaptiveLimiter(initial=2, maximum=2)
+    client = ApiClient(
+        f"http://127.0.0.1:{server.server_port}", "a", "b", limiter=limiter
+    )
+    try:
+        resp = client.send(client.url("doc"), {}, stream=True)
+        assert limiter.in_flight == 1
+        with resp:
+            pass
+        assert limiter.in_flight == 0
+        client.send(client.url("employees"), {}, stream=True, hold=False).close()
+        assert limiter.in_flight == 0
+    finally:
+        server.shutdown()
@@ -0,0 +1,75 @@
+# tctoolbox/tests/test_asof.py
+import pytest
+
+from core.asof import IntervalIndex, asof_rows
+
+
+def _entry(value, valid_from, valid_to=None, **extra):
+    return {
+        "data": {"value": value},
+        "dataValidFrom": valid_from,
+        "dataValidTo": valid_to,
+        **extra,
+    }
+
+
+TIMELINE = IntervalIndex(
+    [
+        # Out of order on purpose: the index sorts by start
+        _entry("C", "2021-01-01"),
+        _entry("A", "2020-01-01", "2020-03-31"),
+        # Gap from 2020-04-01 to 2020-04-30
+        _entry("B", "2020-05-01T08:00:00", "2020-12-31T17:00:00"),
+    ]
+)
+
+
+@pytest.mark.parametrize(
+    "date, value",
+    [
+        ("2019-12-31", ""),  # before the first entry
+        ("2020-01-01", "A"),  # first day
+        ("2020-03-31", "A"),  # Valid To is inclusive
+        ("2020-04-01", ""),  # in the gap
+        ("2020-04-30", ""),
+        ("2020-05-01", "B"),  # datetimes compare by day
+        ("2020-12-31", "B"),
+        ("2021-01-01", "C"),
+        ("2999-01-01", "C"),  # open-ended
+    ],
+)
+def test_value_at_boundaries(date, value):
+    assert TIMELINE.at(date) == value
+
+
+def test_equal_starts_keep_the_later_entry():
+    index = IntervalIndex(
+        [_entry("first", "2020-01-01"), _entry("second", "2020-01-01")]
+    )
+    assert index.at("2020-01-01") == "second"
+
+
+def test_missing_start_falls_back_to_last_modified():
+    index = IntervalIndex([_entry("X", None, lastModified="2020-02-02T10:00:00")])
+    assert index.at("2020-02-01") == ""
+    assert index.at("2020-02-02") == "X"
+
+
+def test_rows_per_employee_and_date():
+    emp = {
+        "name": "Anna",
+        "username": "anna",
+        "field": {
+            "0": {"data": {"value": "E1"}},
+            "1000": {"timelineChange": [_entry("A", "2020-01-01", "2020-03-31")]},
+        },
+    }
+    rows = list(
+        asof_rows(
+            [emp], "0: Profile ID", ["1000: Salary"], ["2020-01-01", "2020-04-01"]
+        )
+    )
+    assert rows == [
+        ["2020-01-01", "E1", "Anna", "anna", "A"],
+        ["2020-04-01", "E1", "Anna", "anna", ""],
+    ]
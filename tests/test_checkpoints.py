@@ -0,0 +1,84 @@
+# tctoolbox/tests/test_checkpoints.py
+from datetime import datetime, timezone
+
+from core.checkpoints import HistoryCheckpoint, entry_hash
+
+IDENTIFIER = "0: Profile ID"
+FIELDS = ["1000: Salary", "1001: Title"]
+
+
+class _Client:
+    base_url = "https://tenant.example/mono/api"
+    client_id = "app"
+
+
+def _load(tmp_path):
+    return HistoryCheckpoint.load(
+        _Client(), IDENTIFIER, FIELDS, directory=str(tmp_path)
+    )
+
+
+def _entry(value, modified, valid_to=None):
+    return {"data": {"value": value}, "lastModified": modified, "dataValidTo": valid_to}
+
+
+def _employee(salary, title=None):
+    fields = {"0": {"data": {"value": "E1"}}, "1000": {"timelineChange": salary}}
+    if title is not None:
+        fields["1001"] = {"timelineChange": title}
+    return {"username": "anna", "field": fields}
+
+
+def _run(tmp_path, employees):
+    checkpoint = _load(tmp_path)
+    delta = list(checkpoint.filter(employees, IDENTIFIER, FIELDS))
+    checkpoint.save()
+    return delta
+
+
+def _timeline(emp, fid):
+    return emp["field"][fid]["timelineChange"]
+
+
+def test_first_run_exports_everything_and_round_trips(tmp_path):
+    salary = [_entry("100", "2000-01-01T00:00:00")]
+    delta = _run(tmp_path, [_employee(salary)])
+    assert _timeline(delta[0], "1000") == salary
+
+    loaded = _load(tmp_path)
+    assert loaded.last_run is not None and loaded.last_run.tzinfo is not None
+    assert loaded.hashes == {"E1": {"1000": entry_hash(salary[-1])}}
+
+
+def test_unchanged_last_entry_skips_the_employee(tmp_path):
+    salary = [_entry("100", "2000-01-01T00:00:00")]
+    _run(tmp_path, [_employee(salary)])
+    assert _run(tmp_path, [_employee(salary)]) == []
+
+
+def test_closed_entry_is_carried_over_with_the_new_one(tmp_path):
+    old = _entry("100", "2000-01-01T00:00:00")
+    _run(tmp_path, [_employee([old])])
+    # The old value was closed by a change made after the checkpoint
+    closed = _entry("100", "2000-01-01T00:00:00", valid_to="2099-01-31")
+    new = _entry("200", "2099-02-01T00:00:00")
+    delta = _run(tmp_path, [_employee([closed, new])])
+    assert _timeline(delta[0], "1000") == [closed, new]
+
+
+def test_newly_added_field_exports_its_whole_window(tmp_path):
+    salary = [_entry("100", "2000-01-01T00:00:00")]
+    _run(tmp_path, [_employee(salary)])
+    title = [_entry("Engineer", "2000-01-01T00:00:00")]
+    delta = _run(tmp_path, [_employee(salary, title)])
+    # Salary is unchanged, so only the new field carries entries
+    assert _timeline(delta[0], "1000") == []
+    assert _timeline(delta[0], "1001") == title
+
+
+def test_since_date_overlaps_the_last_run_by_a_day(tmp_path):
+    assert _load(tmp_path).since_date is None
+    checkpoint = HistoryCheckpoint(
+        "unused", last_run=datetime(2024, 3, 10, 0, 30, tzinfo=timezone.utc)
+    )
+    assert checkpoint.since_date == "2024-03-09"
@@ -0,0 +1,173 @@
+# tctoolbox/tests/test_documents.py
+import io
+
+import pytest
+import requests
+
+from core.documents import _stream_to, download_documents
+from core.retry import RetryPolicy
+
+
+class _Response:
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _Client:
+    """Serves one body per request; a body item that is an exception is
+    raised while the body is read."""
+
+    def __init__(self, bodies, get_error=None):
+        self.retry = RetryPolicy(max_retries=2, backoff_base=0)
+        self.bodies = list(bodies)
+        self.get_error = get_error
+        self.gets = 0
+
+    def get(self, link, stream=False):
+        self.gets += 1
+        if self.get_error:
+            raise self.get_error
+        return _Response(self.bodies.pop(0))
+
+    def iter_content(self, resp):
+        for chunk in resp.chunks:
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+
+
+def test_stream_to_retries_body_from_the_start():
+    broken = requests.exceptions.ChunkedEncodingError("cut")
+    client = _Client([[b"ab", broken], [b"ab", b"cd"]])
+    f = io.BytesIO()
+    assert _stream_to(client, "doc", f)[0] == 4
+    assert f.getvalue() == b"abcd"
+    assert client.gets == 2
+
+
+def test_stream_to_leaves_request_failures_to_the_client():
+    # ApiClient.send retries these already; retrying again multiplies attempts
+    client = _Client([], get_error=requests.ConnectionError("refused"))
+    with pytest.raises(requests.ConnectionError):
+        _stream_to(client, "doc", io.BytesIO())
+    assert client.gets == 1
+
+
+class _Documents(_Client):
+    """Serves each link's name as its body; links in ``failing`` fail."""
+
+    def __init__(self, failing=()):
+        super().__init__([])
+        self.failing = set(failing)
+        self.fetched = []
+
+    def get(self, link, stream=False):
+        self.gets += 1
+        self.fetched.append(link)
+        if link in self.failing:
+            raise requests.HTTPError(f"500 Server Error for {link}")
+        return _Response([link.encode()])
+
+
+def _employee(username, identifier, link="d"):
+    fields = {
+        "500": {
+            "type": "DOCUMENTSINGLE",
+            "data": {"title": "Contract", "extension": "pdf", "link": {"href": link}},
+        }
+    }
+    if identifier is not None:
+        fields["0"] = {"data": {"value": identifier}}
+    return {"username": username, "field": fields}
+
+
+def test_unnamed_documents_are_errors_not_job_failures(tmp_path):
+    employees = [_employee("anna", 101), _employee(None, None), _employee("bo", "7")]
+    downloaded, total, errors, _ = download_documents(
+        _Documents(),
+        employees,
+        ["500: Contract (DOCUMENTSINGLE)"],
+        "0: Profile ID",
+        str(tmp_path),
+        workers=2,
+    )
+    assert (downloaded, total) == (2, 3)
+    assert errors == ["None fid 500: no identifier value or username"]
+    assert (tmp_path / "Contract" / "101" / "Contract.pdf").read_bytes() == b"d"
+
+
+CONTRACTS = ["500: Contract (DOCUMENTSINGLE)"]
+
+
+def _staff():
+    return [_employee(f"user{n}", f"E{n}", link=f"doc{n}") for n in range(6)]
+
+
+def _download(client, folder, **kwargs):
+    return download_documents(
+        client, _staff(), CONTRACTS, "0: Profile ID", str(folder), workers=1, **kwargs
+    )
+
+
+def test_resume_after_an_interrupted_run(tmp_path):
+    class Interrupted(Exception):
+        pass
+
+    done = []
+
+    def progress(items, nbytes):
+        done.append(items)
+        if len(done) == 3:
+            raise Interrupted()
+
+    with pytest.raises(Interrupted):
+        download_documents(
+            _Documents(),
+            _staff(),
+            CONTRACTS,
+            "0: Profile ID",
+            str(tmp_path),
+            progress=progress,
+            workers=1,
+        )
+    client = _Documents()
+    downloaded, total, errors, stats = _download(client, tmp_path)
+    assert (total, errors) == (6, [])
+    # Only what the first run did not finish is fetched again
+    assert stats["skipped"] == 3 and downloaded == 3
+    assert client.fetched == ["doc3", "doc4", "doc5"]
+    for n in range(6):
+        path = tmp_path / "Contract" / f"E{n}" / "Contract.pdf"
+        assert path.read_bytes() == f"doc{n}".encode()
+
+
+def test_retry_failed_fetches_only_failed_documents(tmp_path):
+    downloaded, _, errors, _ = _download(_Documents(failing={"doc1", "doc4"}), tmp_path)
+    assert downloaded == 4 and len(errors) == 2
+
+    client = _Documents()
+    downloaded, total, errors, stats = _download(client, tmp_path, retry_failed=True)
+    assert sorted(client.fetched) == ["doc1", "doc4"]
+    assert (downloaded, total, errors, stats["skipped"]) == (2, 6, [], 4)
+    # Nothing is left to retry
+    client = _Documents()
+    _download(client, tmp_path, retry_failed=True)
+    assert client.fetched == []
+
+
+def test_resume_downloads_again_on_checksum_mismatch(tmp_path):
+    _download(_Documents(), tmp_path)
+    # Same size, different content
+    damaged = tmp_path / "Contract" / "E2" / "Contract.pdf"
+    damaged.write_bytes(b"XXXX")
+    client = _Documents()
+    downloaded, _, _, stats = _download(client, tmp_path)
+    assert client.fetched == ["doc2"]
+    assert (downloaded, stats["skipped"]) == (1, 5)
+    assert damaged.read_bytes() == b"doc2"
@@ -0,0 +1,24 @@
+# tctoolbox/tests/test_exports.py
+import os
+import time
+
+from core import exports
+
+
+def test_purge_exports_due_removes_expired_exports_once_per_interval(
+    tmp_path, monkeypatch
+):
+    monkeypatch.setattr(exports, "_last_purge", 0.0)
+    old = tmp_path / "export-old.zip"
+    old.write_bytes(b"x")
+    stale = time.time() - exports.EXPORT_TTL - 60
+    os.utime(old, (stale, stale))
+    fresh = tmp_path / "export-new.zip"
+    fresh.write_bytes(b"x")
+
+    assert exports.purge_exports_due(directory=str(tmp_path)) == 1
+    assert not old.exists() and fresh.exists()
+    os.utime(fresh, (stale, stale))
+    # Within the interval the folder is not checked again
+    assert exports.purge_exports_due(directory=str(tmp_path)) == 0
+    assert fresh.exists()
@@ -0,0 +1,154 @@
+# tctoolbox/tests/test_history.py
+import csv
+import io
+import zipfile
+
+import pytest
+
+from core.history import write_history_parquet, write_history_zip
+
+
+def _employee(identifier, value):
+    return {
+        "name": None,
+        "username": "anna",
+        "field": {
+            "0": {"name": "Profile ID", "data": {"value": identifier}},
+            "1000": {
+                "name": "Salary",
+                "timelineChange": [
+                    {
+                        "data": {"value": value},
+                        "dataValidFrom": "2020-01-01",
+                        "dataValidTo": "2020-12-31",
+                    },
+                    {"data": {"value": "x"}, "dataValidFrom": "2021-01-01"},
+                ],
+            },
+        },
+    }
+
+
+def test_parquet_accepts_non_string_values(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    target = tmp_path / "history.parquet"
+    write_history_parquet(
+        [_employee(100001, 4200)], "0: Profile ID", ["1000: Salary"], target
+    )
+    table = pq.read_table(target).to_pydict()
+    assert table["identifier"] == ["100001", "100001"]
+    assert table["value"] == ["4200", "x"]
+    assert table["name"] == [None, None]
+    assert table["valid_to"][1] is None
+
+
+def _reference_csv(employees, identifier, field, exclude_current):
+    """The row-by-row csv.writer export the columnar writer replaced."""
+    id_fid, id_name = identifier.split(": ", 1)
+    fid, fname = field.split(": ", 1)
+    out = io.StringIO(newline="")
+    writer = csv.writer(out, delimiter=";")
+    writer.writerow([id_name, "Name", "Username", fname, "Valid From", "Valid To"])
+    for emp in employees:
+        id_val = emp.get("field", {}).get(id_fid, {}).get("data", {}).get("value", "")
+        for rec in emp.get("field", {}).get(fid, {}).get("timelineChange", []):
+            vf = rec.get("dataValidFrom") or rec.get("lastModified")
+            vt = rec.get("dataValidTo") or ""
+            if exclude_current and not vt:
+                continue
+            d = rec.get("data")
+            if isinstance(d, dict):
+                val = d.get("value") or d.get("alternativeExportValue") or ""
+            elif isinstance(d, list):
+                val = ";".join(x.get("value", "") for x in d)
+            else:
+                val = ""
+            writer.writerow([id_val, emp.get("name"), emp.get("username"), val, vf, vt])
+    return out.getvalue().encode("utf-8")
+
+
+def _tricky_employees():
+    def entry(data, valid_from, valid_to=None, **extra):
+        return {
+            "data": data,
+            "dataValidFrom": valid_from,
+            "dataValidTo": valid_to,
+            **extra,
+        }
+
+    return [
+        {
+            "name": 'Anna "Ann" Öberg',
+            "username": "anna;o",
+            "field": {
+                "0": {"data": {"value": 7}},
+                "1000": {
+                    "timelineChange": [
+                        entry({"value": "a;b"}, "2020-01-01", "2020-06-30"),
+                        entry({"value": 'say "hi"'}, "2020-07-01", "2020-12-31"),
+                        entry({"value": "line\nbreak\r\nend"}, "2021-01-01"),
+                    ]
+                },
+                "1001": {
+                    "timelineChange": [
+                        entry({"value": 1.5}, "2020-01-01", "2020-12-31"),
+                        entry(
+                            {"value": None, "alternativeExportValue": 3}, "2021-01-01"
+                        ),
+                    ]
+                },
+            },
+        },
+        {
+            "name": None,
+            "username": None,
+            "field": {
+                "1000": {
+                    "timelineChange": [
+                        entry(
+                            [{"value": "x"}, {"value": "y"}],
+                            None,
+                            "2019-12-31",
+                            lastModified="2019-01-01T10:00:00",
+                        ),
+                        entry(None, "2020-01-01"),
+                    ]
+                },
+                "1001": {"timelineChange": [entry({"value": True}, "2020-01-01")]},
+            },
+        },
+        {
+            "name": "Bo",
+            "username": "bo",
+            "field": {
+                "0": {"data": {"value": "B1"}},
+                # Nothing to quote: takes the joined-rows path
+                "1002": {
+                    "timelineChange": [
+                        entry({"value": 42}, "2020-01-01", "2020-12-31"),
+                        entry({"value": "plain"}, "2021-01-01"),
+                    ]
+                },
+            },
+        },
+    ]
+
+
+@pytest.mark.parametrize("exclude_current", [False, True])
+def test_csv_matches_csv_writer_reference(exclude_current):
+    employees = _tricky_employees()
+    identifier = "0: Profile ID"
+    fields = ["1000: Notes", "1001: Amount", "1002: Grade"]
+    target = io.BytesIO()
+    write_history_zip(
+        iter(employees), identifier, fields, target, exclude_current=exclude_current
+    )
+    with zipfile.ZipFile(target) as z:
+        assert z.namelist() == [
+            "historical_Notes.csv",
+            "historical_Amount.csv",
+            "historical_Grade.csv",
+        ]
+        for field, name in zip(fields, z.namelist()):
+            expected = _reference_csv(employees, identifier, field, exclude_current)
+            assert z.read(name) == expected
@@ -0,0 +1,23 @@
+# tctoolbox/tests/test_jobs.py
+import threading
+
+from core.archive import compression_memory
+from core.jobs import QUEUED, RUNNING, JobRunner, job_memory
+
+
+def test_parallel_compression_claim_holds_back_other_jobs():
+    release = threading.Event()
+    runner = JobRunner(max_workers=2, memory_budget=1024**3)
+
+    def work(job):
+        release.wait(5)
+
+    big = runner.submit(
+        "history_export", work, memory=job_memory(compression_memory(8))
+    )
+    small = runner.submit("history_export", work, memory=job_memory())
+    try:
+        assert big.status == RUNNING
+        assert small.status == QUEUED
+    finally:
+        release.set()
@@ -0,0 +1,28 @@
+# tctoolbox/tests/test_jsonstream.py
+import json
+
+import pytest
+
+from core.jsonstream import iter_array
+
+
+def _split(raw: bytes, size: int):
+    return [raw[i : i + size] for i in range(0, len(raw), size)]
+
+
+@pytest.mark.parametrize(
+    "doc",
+    [
+        {"employees": [1.5, 2]},
+        {"x": -0.5, "employees": [{"id": 1e3}, -12, 0.25]},
+        {"employees": [10, 2.5e-3, True, None, "1.5"], "total": 100},
+    ],
+)
+def test_numbers_split_at_chunk_boundaries(doc):
+    raw = json.dumps(doc).encode()
+    for size in (1, 2, 3):
+        assert list(iter_array(_split(raw, size), "employees")) == doc["employees"]
+    # Every single split point, e.g. b'{"x": -0.' + b'5, ...'
+    for cut in range(1, len(raw)):
+        chunks = [raw[:cut], raw[cut:]]
+        assert list(iter_array(chunks, "employees")) == doc["employees"]
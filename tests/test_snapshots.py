@@ -0,0 +1,42 @@
+# tctoolbox/tests/test_snapshots.py
+import pytest
+
+from core.snapshots import SnapshotCache, iter_employees_cached
+
+
+class _Client:
+    base_url = "https://tenant.example/mono/api"
+    client_id = "app"
+
+    def __init__(self, secret, valid=True):
+        self.client_secret = secret
+        self.valid = valid
+        self.fetches = 0
+
+    @property
+    def token(self):
+        if not self.valid:
+            raise PermissionError("invalid client secret")
+        return "token"
+
+    def iter_employees(self, include_inactive=False, since_date=None):
+        self.fetches += 1
+        return iter([{"username": "anna", "field": {}}])
+
+
+def test_snapshot_is_keyed_by_secret_and_checks_credentials(tmp_path):
+    cache = SnapshotCache(directory=str(tmp_path))
+    owner = _Client("right")
+    assert [e["username"] for e in iter_employees_cached(owner, cache=cache)] == [
+        "anna"
+    ]
+    # A hit for the same credentials
+    list(iter_employees_cached(owner, cache=cache))
+    assert owner.fetches == 1
+
+    # Another secret never sees the snapshot, whether it is valid or not
+    other = _Client("other")
+    list(iter_employees_cached(other, cache=cache))
+    assert other.fetches == 1
+    with pytest.raises(PermissionError):
+        iter_employees_cached(_Client("right", valid=False), cache=cache)
@@ -0,0 +1,38 @@
+# tctoolbox/tests/test_tokens.py
+import pytest
+
+from core import tokens
+from core.tokens import TokenManager
+
+
+class _Client:
+    base_url = "https://tenant.example/mono/api"
+    client_id = "app"
+    client_secret = "secret"
+
+    def __init__(self, lifetime):
+        self.lifetime = lifetime
+        self.requests = 0
+
+    def request_token(self):
+        self.requests += 1
+        return {"access_token": f"t{self.requests}", "expires_in": self.lifetime}
+
+
+@pytest.mark.parametrize(
+    "lifetime, reused_until, refreshed_at",
+    [(3600, 3539, 3541), (60, 29, 31), (10, 4, 6)],
+)
+def test_refresh_margin_is_clamped_to_half_the_lifetime(
+    monkeypatch, lifetime, reused_until, refreshed_at
+):
+    now = [1000.0]
+    monkeypatch.setattr(tokens.time, "monotonic", lambda: now[0])
+    manager = TokenManager()
+    client = _Client(lifetime)
+    assert manager.get(client) == "t1"
+    now[0] += reused_until
+    assert manager.get(client) == "t1"
+    now[0] = 1000.0 + refreshed_at
+    assert manager.get(client) == "t2"
+    assert client.requests == 2